@@ -1,6 +1,32 @@
-import cloudinary
-import cloudinary.uploader
+import asyncio
 import os
+import random
+import time
+import cloudinary
+import cloudinary.utils
+import httpx
+from utils.metrics import Histogram
+
+# Upload API base; point it at scripts/fake_cloudinary.py to test without Cloudinary
+CLOUDINARY_UPLOAD_URL = os.getenv("CLOUDINARY_UPLOAD_URL", "https://api.cloudinary.com/v1_1")
+# Uploads in flight per worker; callers beyond it wait their turn
+CLOUDINARY_MAX_CONCURRENCY = int(os.getenv("CLOUDINARY_MAX_CONCURRENCY", "4"))
+CLOUDINARY_CONNECT_TIMEOUT = float(os.getenv("CLOUDINARY_CONNECT_TIMEOUT", "5"))
+CLOUDINARY_TIMEOUT = float(os.getenv("CLOUDINARY_TIMEOUT", "30"))
+# Attempts after the first one, for timeouts, connection errors, 429 and 5xx
+CLOUDINARY_MAX_RETRIES = int(os.getenv("CLOUDINARY_MAX_RETRIES", "2"))
+CLOUDINARY_RETRY_BACKOFF = float(os.getenv("CLOUDINARY_RETRY_BACKOFF", "0.5"))
+
+_client = None
+_upload_semaphore = asyncio.Semaphore(CLOUDINARY_MAX_CONCURRENCY)
+_upload_stats = {
+    "upload_ms": Histogram(),
+    "wait_ms": Histogram(),
+    "uploads": 0,
+    "retries": 0,
+    "failures": 0,
+    "in_flight": 0,
+}
 
 def configure_cloudinary():
     """Configure Cloudinary with environment variables"""
@@ -10,31 +36,107 @@ def configure_cloudinary():
         api_secret=os.getenv("CLOUDINARY_API_SECRET", "ZL1XhzbD6V_IkfIclP-CPNfBSL4"),
         secure=True
     )
+    # Built here so loading the TLS context (~150 ms) is not paid inside the first upload
+    _get_client()
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(CLOUDINARY_TIMEOUT, connect=CLOUDINARY_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=CLOUDINARY_MAX_CONCURRENCY),
+        )
+    return _client
+
+async def close_cloudinary_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def _signed_params(folder: str, public_id: str) -> dict:
+    """Upload parameters signed the same way cloudinary.uploader signs them"""
+    config = cloudinary.config()
+    params = {"folder": folder, "public_id": public_id, "timestamp": int(time.time())}
+    params["signature"] = cloudinary.utils.api_sign_request(params, config.api_secret)
+    params["api_key"] = config.api_key
+    return params
+
+def _error_message(response: httpx.Response) -> str:
+    try:
+        return f"HTTP {response.status_code}: {response.json()['error']['message']}"
+    except Exception:
+        return f"HTTP {response.status_code}"
+
+def _retryable(response: httpx.Response) -> bool:
+    return response.status_code == 429 or response.status_code >= 500
+
+async def _post_with_retries(url: str, params: dict, file_content: bytes, filename: str) -> dict:
+    for attempt in range(CLOUDINARY_MAX_RETRIES + 1):
+        last_attempt = attempt == CLOUDINARY_MAX_RETRIES
+        try:
+            response = await _get_client().post(url, data=params, files={"file": (filename, file_content)})
+            if not _retryable(response) or last_attempt:
+                if response.is_error:
+                    raise Exception(_error_message(response))
+                return response.json()
+            reason = f"HTTP {response.status_code}"
+        except httpx.TransportError as e:
+            if last_attempt:
+                raise
+            reason = type(e).__name__
+        # Exponential backoff with jitter so retries from several workers spread out
+        delay = CLOUDINARY_RETRY_BACKOFF * (2 ** attempt) * (0.5 + random.random())
+        _upload_stats["retries"] += 1
+        print(f"⚠️  Cloudinary upload {reason}, retry {attempt + 1} in {delay:.1f}s")
+        await asyncio.sleep(delay)
 
 async def upload_to_cloudinary(file_content: bytes, filename: str, folder: str = "vouchers"):
     """
     Upload file to Cloudinary
-    
+
+    Non-blocking: goes through the upload API with httpx, at most
+    CLOUDINARY_MAX_CONCURRENCY at a time per worker, with timeouts and
+    retries (see the CLOUDINARY_* settings above).
+
     Args:
         file_content: Binary content of the file
         filename: Original filename
         folder: Cloudinary folder (default: "vouchers")
-    
+
     Returns:
         dict with 'url' and 'public_id'
     """
-    try:
-        # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
-            file_content,
-            folder=folder,
-            resource_type="auto",
-            public_id=filename.rsplit('.', 1)[0] if '.' in filename else filename
-        )
-        
-        return {
-            "url": result.get("secure_url"),
-            "public_id": result.get("public_id")
-        }
-    except Exception as e:
-        raise Exception(f"Error uploading to Cloudinary: {str(e)}")
+    public_id = filename.rsplit('.', 1)[0] if '.' in filename else filename
+    url = f"{CLOUDINARY_UPLOAD_URL}/{cloudinary.config().cloud_name}/auto/upload"
+
+    queued = time.perf_counter()
+    async with _upload_semaphore:
+        start = time.perf_counter()
+        _upload_stats["wait_ms"].observe((start - queued) * 1000)
+        _upload_stats["in_flight"] += 1
+        try:
+            result = await _post_with_retries(url, _signed_params(folder, public_id), file_content, filename)
+        except Exception as e:
+            _upload_stats["failures"] += 1
+            raise Exception(f"Error uploading to Cloudinary: {str(e) or type(e).__name__}")
+        finally:
+            _upload_stats["in_flight"] -= 1
+            _upload_stats["upload_ms"].observe((time.perf_counter() - start) * 1000)
+
+    _upload_stats["uploads"] += 1
+    return {
+        "url": result.get("secure_url"),
+        "public_id": result.get("public_id")
+    }
+
+def get_upload_stats():
+    return {
+        "max_concurrency": CLOUDINARY_MAX_CONCURRENCY,
+        "in_flight": _upload_stats["in_flight"],
+        "uploads": _upload_stats["uploads"],
+        "retries": _upload_stats["retries"],
+        "failures": _upload_stats["failures"],
+        "upload_ms": _upload_stats["upload_ms"].snapshot(),
+        "wait_ms": _upload_stats["wait_ms"].snapshot(),
+    }
@@ -1,11 +1,15 @@
 import asyncpg
+from datetime import datetime
+from config.database import db_connection
+from models.pagination import ListQuery
+from utils.json_response import RecordStreamResponse
+from utils.pagination import SqlParams, build_sql, keyset_page, student_search_clause
 
-async def get_dashboard_data(db: asyncpg.Connection):
-    """Get dashboard using the extended view (like Node.js)"""
-    dashboard = await db.fetch(
+async def get_dashboard_data():
+    """Get dashboard using the extended view (like Node.js), streamed as a JSON array"""
+    return await RecordStreamResponse.open(
         "SELECT * FROM view_dashboard_admin_extended ORDER BY student_id DESC"
     )
-    return [dict(d) for d in dashboard]
 
 async def get_analytics(cycle_id: int, student_id: int, db: asyncpg.Connection):
     """Get analytics summary - matches Node.js logic"""
@@ -28,32 +32,50 @@ async def get_analytics(cycle_id: int, student_id: int, db: asyncpg.Connection):
     analytics = await db.fetch(sql, *params)
     return [dict(a) for a in analytics]
 
-async def get_notifications(student_id: int, notification_type: str, limit: int, db: asyncpg.Connection):
-    """Get notifications - matches Node.js logic"""
-    sql = """
+async def get_notifications(student_id: int, notification_type: str, limit: int, filters: ListQuery, db: asyncpg.Connection):
+    """Get notifications - matches Node.js logic; a keyset page when filters.page_size is set"""
+    base_sql = """
         SELECT nl.*, s.first_name, s.last_name, s.dni
         FROM notifications_log nl
         JOIN students s ON nl.student_id = s.id
-        WHERE 1=1
     """
-    params = []
-    param_index = 1
+    params = SqlParams()
+    where = []
     
     if student_id:
-        sql += f" AND nl.student_id = ${param_index}"
-        params.append(student_id)
-        param_index += 1
+        where.append(f"nl.student_id = {params.add(student_id)}")
     
     if notification_type:
-        sql += f" AND nl.type = ${param_index}"
-        params.append(notification_type)
-        param_index += 1
+        where.append(f"nl.type = {params.add(notification_type)}")
+    
+    if filters.status:
+        where.append(f"nl.status = {params.add(filters.status)}")
+    
+    if filters.date_from:
+        where.append(f"nl.sent_at >= {params.add(filters.date_from)}::date")
+    
+    if filters.date_to:
+        where.append(f"nl.sent_at < {params.add(filters.date_to)}::date + 1")
+    
+    if filters.q:
+        where.append(student_search_clause(params, filters.q))
+    
+    order_by = "nl.sent_at DESC, nl.id DESC"
     
-    sql += f" ORDER BY nl.sent_at DESC LIMIT ${param_index}"
-    params.append(limit if limit else 50)
+    if not filters.page_size:
+        sql = build_sql(base_sql, where, order_by) + f" LIMIT {params.add(limit if limit else 50)}"
+        notifications = await db.fetch(sql, *params)
+        return [dict(n) for n in notifications]
     
-    notifications = await db.fetch(sql, *params)
-    return [dict(n) for n in notifications]
+    return await keyset_page(
+        db, base_sql, where, params,
+        order_by=order_by,
+        keyset="(nl.sent_at, nl.id) <",
+        key_types=(datetime.fromisoformat, int),
+        row_key=lambda row: (row['sent_at'], row['id']),
+        page_size=filters.page_size,
+        cursor=filters.cursor
+    )
 
 async def get_attendance_absences(cycle_id: int, date_str: str, group_label: str, db: asyncpg.Connection):
     """Get students with absences on specific date, cycle, and group"""
@@ -101,13 +123,19 @@ async def get_attendance_absences(cycle_id: int, date_str: str, group_label: str
     
     return [dict(s) for s in students]
 
-async def send_attendance_notifications(cycle_id: int, date_str: str, group_label: str, db: asyncpg.Connection):
-    """Send WhatsApp notifications to parents of students with absences"""
+async def send_attendance_notifications(cycle_id: int, date_str: str, group_label: str):
+    """Send WhatsApp notifications to parents of students with absences.
+    
+    WhatsApp sends are slow, so no pooled connection is held while they run:
+    one scoped connection reads the absences, and each send is logged right
+    after it with its own short one, so an aborted batch keeps its log.
+    """
     from datetime import datetime
     from controllers import notificationController
     
     # Get students with absences
-    students = await get_attendance_absences(cycle_id, date_str, group_label, db)
+    async with db_connection() as db:
+        students = await get_attendance_absences(cycle_id, date_str, group_label, db)
     
     success_count = 0
     error_count = 0
@@ -130,16 +158,7 @@ async def send_attendance_notifications(cycle_id: int, date_str: str, group_labe
             result = await notificationController.send_whatsapp_message(student['phone_to_use'], message)
             
             if result.get('status') == 'success':
-                # Log notification
-                await db.execute(
-                    """INSERT INTO notifications_log (student_id, parent_phone, type, message, status)
-                       VALUES ($1, $2, $3, $4, $5)""",
-                    student['student_id'],
-                    student['phone_to_use'],
-                    'absences_3',
-                    message,
-                    'sent'
-                )
+                log_status = 'sent'
                 success_count += 1
             else:
                 raise Exception(result.get('message', 'Unknown error'))
@@ -147,16 +166,13 @@ async def send_attendance_notifications(cycle_id: int, date_str: str, group_labe
         except Exception as e:
             error_count += 1
             errors.append(f"{student['dni']} - {str(e)}")
-            
-            # Log failed notification
+            log_status = 'failed'
+        
+        async with db_connection() as db:
             await db.execute(
                 """INSERT INTO notifications_log (student_id, parent_phone, type, message, status)
                    VALUES ($1, $2, $3, $4, $5)""",
-                student['student_id'],
-                student['phone_to_use'],
-                'absences_3',
-                message,
-                'failed'
+                student['student_id'], student['phone_to_use'], 'absences_3', message, log_status
             )
     
     return {
@@ -200,3 +216,40 @@ async def get_general_stats(db: asyncpg.Connection):
     stats['pending_payments'] = float(result['total'])
     
     return stats
+
+async def get_scheduled_jobs(db: asyncpg.Connection):
+    """Background jobs with their interval and last run (services/scheduler.py)"""
+    from services.scheduler import scheduler
+    
+    rows = await db.fetch("SELECT * FROM scheduled_jobs")
+    runs = {row['name']: dict(row) for row in rows}
+    return [
+        {
+            "name": job.name,
+            "interval_seconds": job.interval_seconds,
+            **{k: v for k, v in runs.get(job.name, {}).items() if k != "name"}
+        }
+        for job in scheduler.jobs
+    ]
+
+def get_runtime_metrics():
+    """In-process counters for this worker (caches, pools, queues)"""
+    from config.database import get_pool_stats
+    from middleware.auth import principal_cache
+    from utils.security import get_hash_pool_stats
+    from utils.token_versions import token_versions
+    from utils.rate_limit import login_throttle
+    from utils.query_stats import get_route_stats
+    from config.cloudinary import get_upload_stats
+    from utils.images import get_image_stats
+    
+    return {
+        "db_pool": get_pool_stats(),
+        "principal_cache": principal_cache.stats(),
+        "token_versions": token_versions.stats(),
+        "password_hashing": get_hash_pool_stats(),
+        "login_throttle": login_throttle.stats(),
+        "cloudinary_uploads": get_upload_stats(),
+        "voucher_images": get_image_stats(),
+        "queries_by_route": get_route_stats()
+    }
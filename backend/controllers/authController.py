@@ -1,7 +1,8 @@
 import asyncpg
 from models.student import StudentCreate
 from models.user import UserLogin
-from utils.security import get_password_hash, verify_password, create_access_token
+from utils.security import get_password_hash_async, verify_and_update_password_async, create_principal_token
+from utils.rate_limit import login_throttle
 
 async def register_student(data: StudentCreate, db: asyncpg.Connection):
     try:
@@ -10,7 +11,7 @@ async def register_student(data: StudentCreate, db: asyncpg.Connection):
         if existing:
             return {"error": "DNI registrado previamente, por favor ingrese otro"}
         
-        password_hash = get_password_hash(data.password)
+        password_hash = await get_password_hash_async(data.password)
         
         result = await db.fetchrow(
             """INSERT INTO students (dni, first_name, last_name, phone, parent_name, parent_phone, password_hash)
@@ -19,7 +20,7 @@ async def register_student(data: StudentCreate, db: asyncpg.Connection):
             data.parent_name, data.parent_phone, password_hash
         )
         
-        token = create_access_token({"id": result['id'], "role": "student"})
+        token = create_principal_token(result['id'], "student", data.dni)
         
         return {
             "token": token,
@@ -34,59 +35,88 @@ async def register_student(data: StudentCreate, db: asyncpg.Connection):
     except asyncpg.exceptions.UniqueViolationError:
         return {"error": "DNI registrado previamente, por favor ingrese otro"}
 
-async def login_user(credentials: UserLogin, db: asyncpg.Connection):
+# Resolves admin/teacher (users) and student identities, their display fields
+# and current token version in one round trip. users wins over students, like
+# the Node.js backend; both lookups hit the unique username/dni indexes.
+LOGIN_LOOKUP_SQL = """
+    SELECT * FROM (
+        SELECT u.id, u.username, u.role, u.password_hash, u.related_id,
+               t.id AS teacher_id, t.first_name, t.last_name, t.email,
+               COALESCE(tv.version, 0) AS token_version, 0 AS priority
+        FROM users u
+        LEFT JOIN teachers t ON u.role = 'teacher' AND t.id = u.related_id
+        LEFT JOIN auth_token_versions tv ON tv.kind = 'user' AND tv.principal_id = u.id
+        WHERE u.username = $1
+        UNION ALL
+        SELECT s.id, s.dni, 'student', s.password_hash, NULL,
+               NULL, s.first_name, s.last_name, NULL,
+               COALESCE(tv.version, 0), 1
+        FROM students s
+        LEFT JOIN auth_token_versions tv ON tv.kind = 'student' AND tv.principal_id = s.id
+        WHERE s.dni = $1
+    ) candidates
+    ORDER BY priority
+    LIMIT 1
+"""
+
+async def login_user(credentials: UserLogin, db: asyncpg.Connection, client_ip: str = "unknown"):
     """Login - matches Node.js logic: check users table first, then students"""
-    # First try users table (admin/teacher) - like Node.js
-    user = await db.fetchrow(
-        "SELECT id, username, role, password_hash, related_id FROM users WHERE username = $1",
-        credentials.dni
-    )
-    
-    if user:
-        if not verify_password(credentials.password, user['password_hash']):
-            return {"error": "DNI o contraseña incorrectos. Intenta de nuevo."}
-        
-        # Build user data
-        user_data = {
-            "id": user['id'],
-            "username": user['username'],
-            "role": user['role']
+    # Throttled callers are turned away before spending a bcrypt verify
+    retry_after = await login_throttle.retry_after(credentials.dni, client_ip)
+    if retry_after:
+        return {
+            "error": "Demasiados intentos fallidos. Intenta de nuevo en unos minutos.",
+            "retry_after": retry_after
         }
-        
-        # Get additional info for teacher (like Node.js)
-        if user['role'] == 'teacher' and user['related_id']:
-            teacher = await db.fetchrow(
-                "SELECT first_name, last_name, email FROM teachers WHERE id = $1",
-                user['related_id']
-            )
-            if teacher:
-                user_data['name'] = f"{teacher['first_name']} {teacher['last_name']}"
-                user_data['email'] = teacher['email']
-                user_data['related_id'] = user['related_id']
-        
-        token = create_access_token({"id": user['id'], "role": user['role']})
-        return {"token": token, "user": user_data}
     
-    # If not in users, try student table - like Node.js
-    student = await db.fetchrow(
-        "SELECT id, dni, first_name, last_name, password_hash FROM students WHERE dni = $1",
-        credentials.dni
-    )
+    account = await db.fetchrow(LOGIN_LOOKUP_SQL, credentials.dni)
     
-    if not student:
+    if not account:
+        await login_throttle.record_failure(credentials.dni, client_ip)
         return {"error": "No se encontró este DNI. Verifica el número o regístrate primero."}
     
-    if not verify_password(credentials.password, student['password_hash']):
+    valid, new_hash = await verify_and_update_password_async(credentials.password, account['password_hash'])
+    if not valid:
+        await login_throttle.record_failure(credentials.dni, client_ip)
         return {"error": "DNI o contraseña incorrectos. Intenta de nuevo."}
     
-    token = create_access_token({"id": student['id'], "role": "student"})
+    # Stored hash predates the current cost policy: upgrade it transparently
+    if new_hash:
+        table = "students" if account['role'] == 'student' else "users"
+        await db.execute(
+            f"UPDATE {table} SET password_hash = $1 WHERE id = $2 AND password_hash = $3",
+            new_hash, account['id'], account['password_hash']
+        )
+    
+    await login_throttle.record_success(credentials.dni, client_ip)
     
-    return {
-        "token": token,
-        "user": {
-            "id": student['id'],
-            "dni": student['dni'],
-            "role": "student",
-            "name": f"{student['first_name']} {student['last_name']}"
+    token = create_principal_token(
+        account['id'], account['role'], account['username'], account['related_id'],
+        version=account['token_version']
+    )
+    
+    if account['role'] == 'student':
+        return {
+            "token": token,
+            "user": {
+                "id": account['id'],
+                "dni": account['username'],
+                "role": "student",
+                "name": f"{account['first_name']} {account['last_name']}"
+            }
         }
+    
+    # Build user data
+    user_data = {
+        "id": account['id'],
+        "username": account['username'],
+        "role": account['role']
     }
+    
+    # Additional info for teacher (like Node.js)
+    if account['teacher_id']:
+        user_data['name'] = f"{account['first_name']} {account['last_name']}"
+        user_data['email'] = account['email']
+        user_data['related_id'] = account['related_id']
+    
+    return {"token": token, "user": user_data}
@@ -1,66 +1,75 @@
 import asyncpg
-from models.enrollment import EnrollmentCreate, EnrollmentStatusUpdate
-from datetime import date, timedelta
+import orjson
+from models.enrollment import EnrollmentCreate, EnrollmentStatusUpdate, EnrollmentBulkStatusUpdate
+from models.pagination import ListQuery
+from datetime import date, datetime, timedelta
+from config.database import db_connection
+from utils.json_response import RecordStreamResponse
+from utils.pagination import SqlParams, build_sql, keyset_page, student_search_clause
+from utils.seats import is_seat_violation, seat_error_message
 
-async def get_student_enrollments(student_id: int, db: asyncpg.Connection):
-    """Get student enrollments with installments - matches Node.js getByStudent"""
-    enrollments = await db.fetch(
-        """SELECT e.*, 
-                  COALESCE(c.name, p.name) as item_name,
-                  COALESCE(COALESCE(co.price_override, c.base_price), COALESCE(po.price_override, p.base_price)) as item_price,
-                  COALESCE(co.group_label, po.group_label) as group_label,
-                  cyc.name as cycle_name,
-                  cyc.start_date as cycle_start_date,
-                  cyc.end_date as cycle_end_date,
-                  pp.id as payment_plan_id,
-                  pp.total_amount,
-                  pp.installments as total_installments,
-                  (
-                    SELECT STRING_AGG(
-                             c2.name || 
-                             CASE
-                               WHEN co2.group_label IS NOT NULL AND co2.group_label <> ''
-                                 THEN ' (Grupo ' || co2.group_label || ')'
-                               ELSE ''
-                             END,
-                             ', '
-                           )
-                    FROM enrollments e2
-                    JOIN course_offerings co2 ON e2.course_offering_id = co2.id
-                    JOIN courses c2 ON co2.course_id = c2.id
-                    WHERE e2.student_id = e.student_id
-                      AND e2.enrollment_type = 'course'
-                      AND e2.status != 'cancelado'
-                      AND e2.package_offering_id = e.package_offering_id
-                  ) AS package_courses_summary
-           FROM enrollments e
-           LEFT JOIN course_offerings co ON e.course_offering_id = co.id
-           LEFT JOIN courses c ON co.course_id = c.id
-           LEFT JOIN package_offerings po ON e.package_offering_id = po.id
-           LEFT JOIN packages p ON po.package_id = p.id
-           LEFT JOIN cycles cyc ON cyc.id = COALESCE(co.cycle_id, po.cycle_id)
-           LEFT JOIN payment_plans pp ON pp.enrollment_id = e.id
-           WHERE e.student_id = $1
-           ORDER BY e.registered_at DESC""",
-        student_id
+STUDENT_ENROLLMENTS_SQL = """
+    WITH package_courses AS (
+        SELECT e2.package_offering_id,
+               STRING_AGG(
+                 c2.name || 
+                 CASE
+                   WHEN co2.group_label IS NOT NULL AND co2.group_label <> ''
+                     THEN ' (Grupo ' || co2.group_label || ')'
+                   ELSE ''
+                 END,
+                 ', '
+               ) AS summary
+        FROM enrollments e2
+        JOIN course_offerings co2 ON e2.course_offering_id = co2.id
+        JOIN courses c2 ON co2.course_id = c2.id
+        WHERE e2.student_id = $1
+          AND e2.enrollment_type = 'course'
+          AND e2.status != 'cancelado'
+          AND e2.package_offering_id IS NOT NULL
+        GROUP BY e2.package_offering_id
     )
+    SELECT e.*, 
+           COALESCE(c.name, p.name) as item_name,
+           COALESCE(COALESCE(co.price_override, c.base_price), COALESCE(po.price_override, p.base_price)) as item_price,
+           COALESCE(co.group_label, po.group_label) as group_label,
+           cyc.name as cycle_name,
+           cyc.start_date as cycle_start_date,
+           cyc.end_date as cycle_end_date,
+           pp.id as payment_plan_id,
+           pp.total_amount,
+           pp.installments as total_installments,
+           pc.summary AS package_courses_summary,
+           COALESCE(inst.items, '[]') AS installments
+    FROM enrollments e
+    LEFT JOIN course_offerings co ON e.course_offering_id = co.id
+    LEFT JOIN courses c ON co.course_id = c.id
+    LEFT JOIN package_offerings po ON e.package_offering_id = po.id
+    LEFT JOIN packages p ON po.package_id = p.id
+    LEFT JOIN cycles cyc ON cyc.id = COALESCE(co.cycle_id, po.cycle_id)
+    LEFT JOIN payment_plans pp ON pp.enrollment_id = e.id
+    LEFT JOIN package_courses pc ON pc.package_offering_id = e.package_offering_id
+    LEFT JOIN LATERAL (
+        SELECT json_agg(i ORDER BY i.installment_number) AS items
+        FROM installments i
+        WHERE i.payment_plan_id = pp.id
+    ) inst ON true
+    WHERE e.student_id = $1
+    ORDER BY e.registered_at DESC
+"""
+
+async def get_student_enrollments(student_id: int, db: asyncpg.Connection):
+    """Get student enrollments with installments - matches Node.js getByStudent.
+
+    One statement: package course summaries come from a CTE and each
+    enrollment's installments are aggregated to JSON in a lateral join.
+    """
+    enrollments = await db.fetch(STUDENT_ENROLLMENTS_SQL, student_id)
     
-    # For each enrollment, get its installments (like Node.js)
     result = []
     for enrollment in enrollments:
         enr_dict = dict(enrollment)
-        
-        if enr_dict.get('payment_plan_id'):
-            installments = await db.fetch(
-                """SELECT * FROM installments 
-                   WHERE payment_plan_id = $1 
-                   ORDER BY installment_number""",
-                enr_dict['payment_plan_id']
-            )
-            enr_dict['installments'] = [dict(i) for i in installments]
-        else:
-            enr_dict['installments'] = []
-        
+        enr_dict['installments'] = orjson.loads(enr_dict['installments'])
         result.append(enr_dict)
     
     return result
@@ -95,151 +104,206 @@ async def get_enrollments_by_offering(type: str, id: int, status: str, db: async
     )
     return [dict(e) for e in enrollments]
 
+# Cart items arrive as parallel arrays ($2 ids, $3 types); pos keeps cart order
+CART_ITEMS_CTE = """
+    items AS (
+        SELECT t.id, t.type, t.pos
+        FROM unnest($2::int[], $3::text[]) WITH ORDINALITY AS t(id, type, pos)
+    )
+"""
+
+# First conflict in cart order; check_rank keeps the per-item order of the checks
+ENROLLMENT_CONFLICTS_SQL = f"""
+    WITH {CART_ITEMS_CTE},
+    active AS (
+        SELECT course_offering_id, package_offering_id
+        FROM enrollments
+        WHERE student_id = $1 AND status != 'cancelado'
+    )
+    SELECT * FROM (
+        -- Course already enrolled
+        SELECT i.pos, 1 AS check_rank, c.name AS course_name, co.group_label, NULL::text AS package_name
+        FROM items i
+        JOIN course_offerings co ON co.id = i.id
+        JOIN courses c ON co.course_id = c.id
+        WHERE i.type = 'course'
+          AND EXISTS (SELECT 1 FROM active a WHERE a.course_offering_id = i.id)
+        UNION ALL
+        -- Course included in an enrolled package
+        SELECT i.pos, 2, c.name, co.group_label, p.name
+        FROM items i
+        JOIN package_offering_courses poc ON poc.course_offering_id = i.id
+        JOIN active a ON a.package_offering_id = poc.package_offering_id
+        JOIN package_offerings po ON po.id = poc.package_offering_id
+        JOIN packages p ON po.package_id = p.id
+        JOIN course_offerings co ON co.id = i.id
+        JOIN courses c ON co.course_id = c.id
+        WHERE i.type = 'course'
+        UNION ALL
+        -- Package already enrolled
+        SELECT i.pos, 3, NULL, po.group_label, p.name
+        FROM items i
+        JOIN package_offerings po ON po.id = i.id
+        JOIN packages p ON po.package_id = p.id
+        WHERE i.type != 'course'
+          AND EXISTS (SELECT 1 FROM active a WHERE a.package_offering_id = i.id)
+        UNION ALL
+        -- A course of the package already enrolled individually
+        SELECT i.pos, 4, c.name, co.group_label, NULL
+        FROM items i
+        JOIN package_offering_courses poc ON poc.package_offering_id = i.id
+        JOIN course_offerings co ON poc.course_offering_id = co.id
+        JOIN courses c ON co.course_id = c.id
+        WHERE i.type != 'course'
+          AND EXISTS (SELECT 1 FROM active a WHERE a.course_offering_id = co.id)
+    ) conflicts
+    ORDER BY pos, check_rank
+    LIMIT 1
+"""
+
+# Enrollments, payment plans and first installments for the whole cart in one
+# statement. RETURNING cannot carry the cart position, so new rows are matched
+# back to their item by (type, offering id), which is unique after dedupe.
+# Rows are inserted in (type, offering id) order so concurrent carts take the
+# offering seat locks (migration 006 trigger) in the same order.
+CREATE_ENROLLMENTS_SQL = f"""
+    WITH {CART_ITEMS_CTE},
+    priced AS (
+        SELECT i.pos, i.id,
+               CASE WHEN i.type = 'course' THEN 'course' ELSE 'package' END AS enrollment_type,
+               COALESCE(
+                   CASE WHEN i.type = 'course' THEN
+                       (SELECT COALESCE(co.price_override, c.base_price)
+                        FROM course_offerings co JOIN courses c ON co.course_id = c.id
+                        WHERE co.id = i.id)
+                   ELSE
+                       (SELECT COALESCE(po.price_override, p.base_price)
+                        FROM package_offerings po JOIN packages p ON po.package_id = p.id
+                        WHERE po.id = i.id)
+                   END,
+                   0
+               ) AS price
+        FROM items i
+    ),
+    new_enrollments AS (
+        INSERT INTO enrollments (student_id, course_offering_id, package_offering_id, enrollment_type, status)
+        SELECT $1,
+               CASE WHEN enrollment_type = 'course' THEN id END,
+               CASE WHEN enrollment_type = 'package' THEN id END,
+               enrollment_type, 'pendiente'
+        FROM priced
+        ORDER BY enrollment_type, id
+        RETURNING id, enrollment_type, COALESCE(course_offering_id, package_offering_id) AS offering_id
+    ),
+    matched AS (
+        SELECT pr.pos, pr.price, ne.id AS enrollment_id
+        FROM new_enrollments ne
+        JOIN priced pr ON pr.enrollment_type = ne.enrollment_type AND pr.id = ne.offering_id
+    ),
+    new_plans AS (
+        INSERT INTO payment_plans (enrollment_id, total_amount, installments)
+        SELECT enrollment_id, price, 1 FROM matched
+        RETURNING id, enrollment_id, total_amount
+    ),
+    new_installments AS (
+        INSERT INTO installments (payment_plan_id, installment_number, due_date, amount, status)
+        SELECT id, 1, $4, total_amount, 'pending' FROM new_plans
+        RETURNING id, payment_plan_id
+    )
+    SELECT m.pos, m.enrollment_id, np.id AS payment_plan_id, ni.id AS installment_id
+    FROM matched m
+    JOIN new_plans np ON np.enrollment_id = m.enrollment_id
+    JOIN new_installments ni ON ni.payment_plan_id = np.id
+    ORDER BY m.pos
+"""
+
+# Partial unique indexes from migration 008 -> conflict message kind (check_rank)
+ACTIVE_ENROLLMENT_CONSTRAINTS = {
+    "uq_enrollments_active_course": 1,
+    "uq_enrollments_active_package": 3,
+    "uq_enrollments_active_package_course": 1,
+}
+
+def _conflict_message(conflict) -> str:
+    display = conflict['course_name'] if conflict['check_rank'] != 3 else conflict['package_name']
+    if conflict['group_label']:
+        display += f" (Grupo {conflict['group_label']})"
+    
+    if conflict['check_rank'] == 1:
+        return f"Usted ya está matriculado en uno de los cursos seleccionados: {display}. Por favor, verifique nuevamente."
+    if conflict['check_rank'] == 2:
+        return f"Usted ya está matriculado en uno de los cursos seleccionados: {display} (incluido en el paquete '{conflict['package_name']}'). Por favor, verifique nuevamente."
+    if conflict['check_rank'] == 3:
+        return f"Usted ya está matriculado en el paquete seleccionado: {display}. Por favor, verifique nuevamente."
+    return f"Usted ya está matriculado en uno de los cursos del paquete seleccionado: {display}. Por favor, verifique nuevamente."
+
+async def duplicate_error_message(db: asyncpg.Connection, exc: asyncpg.UniqueViolationError) -> str:
+    """Conflict message for an enrollment a status change would duplicate.
+
+    The key is in the violation detail: "Key (student_id, offering, ...)=(1, 5, ...) already exists."
+    """
+    check_rank = ACTIVE_ENROLLMENT_CONSTRAINTS[exc.constraint_name]
+    key_values = exc.detail.split("=(", 1)[1].split(")", 1)[0]
+    offering_id = int(key_values.split(",")[1])
+    if check_rank == 1:
+        row = await db.fetchrow(
+            """SELECT c.name AS course_name, co.group_label FROM course_offerings co
+               JOIN courses c ON co.course_id = c.id WHERE co.id = $1""",
+            offering_id
+        )
+    else:
+        row = await db.fetchrow(
+            """SELECT p.name AS package_name, po.group_label FROM package_offerings po
+               JOIN packages p ON po.package_id = p.id WHERE po.id = $1""",
+            offering_id
+        )
+    return _conflict_message({
+        "check_rank": check_rank,
+        "course_name": row['course_name'] if check_rank == 1 else None,
+        "package_name": row['package_name'] if check_rank == 3 else None,
+        "group_label": row['group_label'],
+    })
+
 async def create_enrollment(student_id: int, data: EnrollmentCreate, db: asyncpg.Connection):
+    """Validate and create the whole cart in two statements, whatever its size"""
+    # The same item twice in one cart is a single enrollment
+    items = list(dict.fromkeys(("course" if item.type == "course" else "package", item.id) for item in data.items))
+    ids = [item_id for _, item_id in items]
+    types = [item_type for item_type, _ in items]
+    
     # PASO 1: Validar todos los items ANTES de crear matrículas
-    for item in data.items:
-        if item.type == "course":
-            # Check if already enrolled in this exact course offering
-            existing = await db.fetchrow(
-                """SELECT co.id, c.name as course_name, co.group_label
-                   FROM enrollments e
-                   JOIN course_offerings co ON e.course_offering_id = co.id
-                   JOIN courses c ON co.course_id = c.id
-                   WHERE e.student_id = $1 AND e.course_offering_id = $2 AND e.status != 'cancelado'""",
-                student_id, item.id
-            )
-            if existing:
-                course_display = f"{existing['course_name']}"
-                if existing['group_label']:
-                    course_display += f" (Grupo {existing['group_label']})"
-                return {
-                    "error": f"Usted ya está matriculado en uno de los cursos seleccionados: {course_display}. Por favor, verifique nuevamente."
-                }
-            
-            # Check if the course is already part of an enrolled package
-            course_in_package = await db.fetchrow(
-                """SELECT c.name as course_name, p.name as package_name, co.group_label
-                   FROM enrollments e
-                   JOIN package_offerings po ON e.package_offering_id = po.id
-                   JOIN packages p ON po.package_id = p.id
-                   JOIN package_offering_courses poc ON poc.package_offering_id = po.id
-                   JOIN course_offerings co ON poc.course_offering_id = co.id
-                   JOIN courses c ON co.course_id = c.id
-                   WHERE e.student_id = $1 
-                     AND e.status != 'cancelado'
-                     AND co.id = $2""",
-                student_id, item.id
-            )
-            if course_in_package:
-                course_display = f"{course_in_package['course_name']}"
-                if course_in_package['group_label']:
-                    course_display += f" (Grupo {course_in_package['group_label']})"
-                return {
-                    "error": f"Usted ya está matriculado en uno de los cursos seleccionados: {course_display} (incluido en el paquete '{course_in_package['package_name']}'). Por favor, verifique nuevamente."
-                }
-            
-        else:  # package
-            # Check if already enrolled in this exact package offering
-            existing = await db.fetchrow(
-                """SELECT p.name as package_name, po.group_label
-                   FROM enrollments e
-                   JOIN package_offerings po ON e.package_offering_id = po.id
-                   JOIN packages p ON po.package_id = p.id
-                   WHERE e.student_id = $1 AND e.package_offering_id = $2 AND e.status != 'cancelado'""",
-                student_id, item.id
-            )
-            if existing:
-                package_display = f"{existing['package_name']}"
-                if existing['group_label']:
-                    package_display += f" (Grupo {existing['group_label']})"
-                return {
-                    "error": f"Usted ya está matriculado en el paquete seleccionado: {package_display}. Por favor, verifique nuevamente."
-                }
-            
-            # Check if any course in this package is already enrolled individually
-            course_conflict = await db.fetchrow(
-                """SELECT c.name as course_name, co.group_label
-                   FROM package_offering_courses poc
-                   JOIN course_offerings co ON poc.course_offering_id = co.id
-                   JOIN courses c ON co.course_id = c.id
-                   JOIN enrollments e ON e.course_offering_id = co.id
-                   WHERE poc.package_offering_id = $1 
-                     AND e.student_id = $2
-                     AND e.status != 'cancelado'
-                   LIMIT 1""",
-                item.id, student_id
-            )
-            if course_conflict:
-                course_display = f"{course_conflict['course_name']}"
-                if course_conflict['group_label']:
-                    course_display += f" (Grupo {course_conflict['group_label']})"
-                return {
-                    "error": f"Usted ya está matriculado en uno de los cursos del paquete seleccionado: {course_display}. Por favor, verifique nuevamente."
-                }
+    conflict = await db.fetchrow(ENROLLMENT_CONFLICTS_SQL, student_id, ids, types)
+    if conflict:
+        return {"error": _conflict_message(conflict)}
     
     # PASO 2: Si llegamos aquí, no hay duplicados - proceder a crear las matrículas
-    created = []
+    first_due_date = date.today() + timedelta(days=7)
+    try:
+        # Savepoint: a full offering or a duplicate aborts only this statement
+        async with db.transaction():
+            rows = await db.fetch(CREATE_ENROLLMENTS_SQL, student_id, ids, types, first_due_date)
+    except asyncpg.CheckViolationError as exc:
+        if not is_seat_violation(exc):
+            raise
+        return {"error": await seat_error_message(db, exc)}
+    except asyncpg.UniqueViolationError as exc:
+        if exc.constraint_name not in ACTIVE_ENROLLMENT_CONSTRAINTS:
+            raise
+        # A concurrent request enrolled the same item after PASO 1; it is committed
+        # now (the index waited for it), so the check finds and names it
+        conflict = await db.fetchrow(ENROLLMENT_CONFLICTS_SQL, student_id, ids, types)
+        if conflict:
+            return {"error": _conflict_message(conflict)}
+        return {"error": await duplicate_error_message(db, exc)}
     
-    for item in data.items:
-        # Get price
-        if item.type == "course":
-            offering = await db.fetchrow(
-                """SELECT COALESCE(price_override, c.base_price) as price
-                   FROM course_offerings co
-                   JOIN courses c ON co.course_id = c.id
-                   WHERE co.id = $1""",
-                item.id
-            )
-            price = offering['price'] if offering else 0
-            
-            # Create enrollment
-            enr_result = await db.fetchrow(
-                """INSERT INTO enrollments (student_id, course_offering_id, enrollment_type, status)
-                   VALUES ($1, $2, 'course', 'pendiente') RETURNING id""",
-                student_id, item.id
-            )
-            enrollment_id = enr_result['id']
-            
-        else:  # package
-            offering = await db.fetchrow(
-                """SELECT COALESCE(price_override, p.base_price) as price
-                   FROM package_offerings po
-                   JOIN packages p ON po.package_id = p.id
-                   WHERE po.id = $1""",
-                item.id
-            )
-            price = offering['price'] if offering else 0
-            
-            # Create enrollment
-            enr_result = await db.fetchrow(
-                """INSERT INTO enrollments (student_id, package_offering_id, enrollment_type, status)
-                   VALUES ($1, $2, 'package', 'pendiente') RETURNING id""",
-                student_id, item.id
-            )
-            enrollment_id = enr_result['id']
-        
-        # Create payment plan
-        plan_result = await db.fetchrow(
-            """INSERT INTO payment_plans (enrollment_id, total_amount, installments)
-               VALUES ($1, $2, 1) RETURNING id""",
-            enrollment_id, price
-        )
-        payment_plan_id = plan_result['id']
-        
-        # Create installment
-        first_due_date = date.today() + timedelta(days=7)
-        inst_result = await db.fetchrow(
-            """INSERT INTO installments (payment_plan_id, installment_number, due_date, amount, status)
-               VALUES ($1, 1, $2, $3, 'pending') RETURNING id""",
-            payment_plan_id, first_due_date, price
-        )
-        installment_id = inst_result['id']
-        
-        created.append({
-            "enrollmentId": enrollment_id,
-            "payment_plan_id": payment_plan_id,
-            "installment_id": installment_id
-        })
+    created = [
+        {
+            "enrollmentId": row['enrollment_id'],
+            "payment_plan_id": row['payment_plan_id'],
+            "installment_id": row['installment_id']
+        }
+        for row in rows
+    ]
     
     return {"message": "Matrículas creadas correctamente", "created": created}
 
@@ -273,97 +337,187 @@ async def cancel_enrollment(student_id: int, enrollment_id: int, db: asyncpg.Con
     
     return {"message": "Matrícula cancelada correctamente"}
 
+# Course rows for accepted package enrollments, skipping active ones that already
+# exist (a cancelled one gets a new row); ON CONFLICT covers a concurrent cascade
+# of the same package (migration 008)
+CASCADE_PACKAGE_COURSES_SQL = """
+    INSERT INTO enrollments 
+        (student_id, course_offering_id, package_offering_id, enrollment_type, status, registered_at)
+    SELECT DISTINCT e.student_id, poc.course_offering_id, e.package_offering_id,
+           'course', 'aceptado', CURRENT_TIMESTAMP
+    FROM enrollments e
+    JOIN package_offering_courses poc ON poc.package_offering_id = e.package_offering_id
+    WHERE e.id = ANY($1::int[])
+      AND e.enrollment_type = 'package'
+      AND NOT EXISTS (
+          SELECT 1 FROM enrollments x
+          WHERE x.student_id = e.student_id
+            AND x.course_offering_id = poc.course_offering_id
+            AND x.package_offering_id = e.package_offering_id
+            AND x.status <> 'cancelado'
+      )
+    ON CONFLICT (student_id, course_offering_id, package_offering_id)
+        WHERE enrollment_type = 'course' AND package_offering_id IS NOT NULL AND status <> 'cancelado'
+        DO NOTHING
+"""
+
+async def cascade_package_courses(enrollment_ids, db: asyncpg.Connection) -> int:
+    """Enroll accepted package enrollments in every course of their package.
+
+    One statement for any number of enrollments; non-package ids are ignored.
+    Returns how many course enrollments were created.
+    """
+    status = await db.execute(CASCADE_PACKAGE_COURSES_SQL, list(enrollment_ids))
+    return int(status.split()[-1])
+
+# Status, type and payment state of a batch of enrollments
+ENROLLMENT_PAYMENT_STATE_SQL = """
+    SELECT e.id, e.enrollment_type, e.package_offering_id,
+           pp.id IS NOT NULL AS has_plan,
+           COALESCE(paid.total, 0) >= pp.total_amount AS fully_paid
+    FROM enrollments e
+    LEFT JOIN payment_plans pp ON pp.enrollment_id = e.id
+    LEFT JOIN LATERAL (
+        SELECT SUM(i.amount) AS total FROM installments i
+        WHERE i.payment_plan_id = pp.id AND i.status = 'paid'
+    ) paid ON true
+    WHERE e.id = ANY($1::int[])
+"""
+
+async def _set_status(db: asyncpg.Connection, enrollment_ids, status: str):
+    """UPDATE in a savepoint; returns an error dict if an offering has no seats
+    left or a reactivated enrollment duplicates an active one"""
+    try:
+        async with db.transaction():
+            await db.execute(
+                "UPDATE enrollments SET status = $1 WHERE id = ANY($2::int[])",
+                status, list(enrollment_ids)
+            )
+    except asyncpg.CheckViolationError as exc:
+        if not is_seat_violation(exc):
+            raise
+        return {"error": await seat_error_message(db, exc)}
+    except asyncpg.UniqueViolationError as exc:
+        if exc.constraint_name not in ACTIVE_ENROLLMENT_CONSTRAINTS:
+            raise
+        return {"error": await duplicate_error_message(db, exc)}
+    return None
+
 async def update_enrollment_status(data: EnrollmentStatusUpdate, db: asyncpg.Connection):
     # Get enrollment details first
     enrollment = await db.fetchrow(
-        "SELECT * FROM enrollments WHERE id = $1",
-        data.enrollment_id
+        ENROLLMENT_PAYMENT_STATE_SQL,
+        [data.enrollment_id]
     )
     
     if not enrollment:
         return {"error": "Matrícula no encontrada"}
     
     # Check payment status if accepting
-    if data.status == "aceptado":
-        payment_check = await db.fetchrow(
-            """SELECT pp.id, pp.total_amount,
-                      COALESCE(SUM(CASE WHEN i.status = 'paid' THEN i.amount ELSE 0 END), 0) as total_paid
-               FROM payment_plans pp
-               LEFT JOIN installments i ON i.payment_plan_id = pp.id AND i.status = 'paid'
-               WHERE pp.enrollment_id = $1
-               GROUP BY pp.id, pp.total_amount""",
-            data.enrollment_id
-        )
-        
-        if not payment_check or payment_check['total_paid'] < payment_check['total_amount']:
-            return {"error": "No se puede aceptar: pago no aprobado completamente"}
+    if data.status == "aceptado" and not (enrollment['has_plan'] and enrollment['fully_paid']):
+        return {"error": "No se puede aceptar: pago no aprobado completamente"}
     
-    # Update enrollment status
-    await db.execute(
-        "UPDATE enrollments SET status = $1 WHERE id = $2",
-        data.status, data.enrollment_id
-    )
+    # Update enrollment status (going back to pendiente/aceptado needs a free seat)
+    error = await _set_status(db, [data.enrollment_id], data.status)
+    if error:
+        return error
     
     # Auto-enroll in package courses if accepting a package enrollment
     courses_enrolled = 0
-    if (data.status == "aceptado" and 
-        enrollment['enrollment_type'] == 'package' and 
-        enrollment['package_offering_id']):
-        
-        # Get all courses in this package offering
-        course_offerings = await db.fetch(
-            """SELECT course_offering_id 
-               FROM package_offering_courses 
-               WHERE package_offering_id = $1""",
-            enrollment['package_offering_id']
-        )
-        
-        # Create enrollment for each course
-        for co in course_offerings:
-            # Check if course enrollment already exists to avoid duplicates
-            existing_course_enr = await db.fetchrow(
-                """SELECT id FROM enrollments 
-                   WHERE student_id = $1 
-                   AND course_offering_id = $2 
-                   AND package_offering_id = $3""",
-                enrollment['student_id'],
-                co['course_offering_id'],
-                enrollment['package_offering_id']
-            )
-            
-            if not existing_course_enr:
-                await db.execute(
-                    """INSERT INTO enrollments 
-                       (student_id, course_offering_id, package_offering_id, 
-                        enrollment_type, status, registered_at)
-                       VALUES ($1, $2, $3, 'course', 'aceptado', CURRENT_TIMESTAMP)""",
-                    enrollment['student_id'],
-                    co['course_offering_id'],
-                    enrollment['package_offering_id']
-                )
-                courses_enrolled += 1
+    if data.status == "aceptado" and enrollment['enrollment_type'] == 'package':
+        courses_enrolled = await cascade_package_courses([data.enrollment_id], db)
     
     if courses_enrolled > 0:
         return {"message": f"Matrícula {data.status}. Estudiante automáticamente matriculado en {courses_enrolled} curso(s) del paquete."}
     
     return {"message": f"Matrícula {data.status}"}
 
-async def get_admin_enrollments(db: asyncpg.Connection):
-    enrollments = await db.fetch(
-        """SELECT e.*, s.first_name, s.last_name, s.dni,
-                  COALESCE(c.name, p.name) as item_name,
-                  COALESCE(co.group_label, po.group_label) as group_label,
-                  cyc.name as cycle_name
-           FROM enrollments e
-           JOIN students s ON e.student_id = s.id
-           LEFT JOIN course_offerings co ON e.course_offering_id = co.id
-           LEFT JOIN courses c ON co.course_id = c.id
-           LEFT JOIN package_offerings po ON e.package_offering_id = po.id
-           LEFT JOIN packages p ON po.package_id = p.id
-           LEFT JOIN cycles cyc ON cyc.id = COALESCE(co.cycle_id, po.cycle_id)
-           ORDER BY e.registered_at DESC"""
-    )
-    return [dict(e) for e in enrollments]
+async def update_enrollment_status_bulk(data: EnrollmentBulkStatusUpdate, db: asyncpg.Connection):
+    """Same rules as update_enrollment_status for many enrollments, in a fixed number of statements"""
+    enrollment_ids = list(dict.fromkeys(data.enrollment_ids))
+    rows = await db.fetch(ENROLLMENT_PAYMENT_STATE_SQL, enrollment_ids)
+    found = {row['id']: row for row in rows}
+    
+    skipped = []
+    to_update = []
+    for enrollment_id in enrollment_ids:
+        row = found.get(enrollment_id)
+        if not row:
+            skipped.append({"enrollment_id": enrollment_id, "reason": "Matrícula no encontrada"})
+        elif data.status == "aceptado" and not (row['has_plan'] and row['fully_paid']):
+            skipped.append({"enrollment_id": enrollment_id, "reason": "Pago no aprobado completamente"})
+        else:
+            to_update.append(enrollment_id)
+    
+    courses_enrolled = 0
+    if to_update:
+        error = await _set_status(db, to_update, data.status)
+        if error:
+            return error
+        if data.status == "aceptado":
+            courses_enrolled = await cascade_package_courses(to_update, db)
+    
+    message = f"{len(to_update)} matrícula(s) {data.status}"
+    if courses_enrolled > 0:
+        message += f". {courses_enrolled} curso(s) de paquete matriculados automáticamente"
+    return {
+        "message": message,
+        "updated": to_update,
+        "skipped": skipped,
+        "courses_enrolled": courses_enrolled
+    }
+
+ADMIN_ENROLLMENTS_SQL = """SELECT e.*, s.first_name, s.last_name, s.dni,
+          COALESCE(c.name, p.name) as item_name,
+          COALESCE(co.group_label, po.group_label) as group_label,
+          cyc.name as cycle_name
+   FROM enrollments e
+   JOIN students s ON e.student_id = s.id
+   LEFT JOIN course_offerings co ON e.course_offering_id = co.id
+   LEFT JOIN courses c ON co.course_id = c.id
+   LEFT JOIN package_offerings po ON e.package_offering_id = po.id
+   LEFT JOIN packages p ON po.package_id = p.id
+   LEFT JOIN cycles cyc ON cyc.id = COALESCE(co.cycle_id, po.cycle_id)"""
+
+def _admin_enrollments_where(filters: ListQuery, params: SqlParams):
+    where = []
+    if filters.cycle_id:
+        cycle = params.add(filters.cycle_id)
+        where.append(f"(co.cycle_id = {cycle} OR po.cycle_id = {cycle})")
+    if filters.status:
+        where.append(f"e.status = {params.add(filters.status)}")
+    if filters.enrollment_type:
+        where.append(f"e.enrollment_type = {params.add(filters.enrollment_type)}")
+    if filters.date_from:
+        where.append(f"e.registered_at >= {params.add(filters.date_from)}::date")
+    if filters.date_to:
+        where.append(f"e.registered_at < {params.add(filters.date_to)}::date + 1")
+    if filters.q:
+        where.append(student_search_clause(params, filters.q))
+    return where
+
+async def get_admin_enrollments(filters: ListQuery):
+    """Admin enrollment list, newest first.
+
+    Streamed as a JSON array (it grows with history) unless filters.page_size
+    asks for a keyset page.
+    """
+    params = SqlParams()
+    where = _admin_enrollments_where(filters, params)
+    order_by = "e.registered_at DESC, e.id DESC"
+    if not filters.page_size:
+        return await RecordStreamResponse.open(build_sql(ADMIN_ENROLLMENTS_SQL, where, order_by), *params)
+    
+    async with db_connection() as db:
+        return await keyset_page(
+            db, ADMIN_ENROLLMENTS_SQL, where, params,
+            order_by=order_by,
+            keyset="(e.registered_at, e.id) <",
+            key_types=(datetime.fromisoformat, int),
+            row_key=lambda row: (row['registered_at'], row['id']),
+            page_size=filters.page_size,
+            cursor=filters.cursor
+        )
 
 async def delete_enrollment(enrollment_id: int, db: asyncpg.Connection):
     await db.execute("DELETE FROM enrollments WHERE id = $1", enrollment_id)
@@ -49,10 +49,10 @@ async def update_package(package_id: int, data: PackageUpdate, db: asyncpg.Conne
     # Update courses if provided
     if data.course_ids is not None:
         await db.execute("DELETE FROM package_courses WHERE package_id = $1", package_id)
-        for course_id in data.course_ids:
-            await db.execute(
+        if data.course_ids:
+            await db.executemany(
                 "INSERT INTO package_courses (package_id, course_id) VALUES ($1, $2)",
-                package_id, course_id
+                [(package_id, course_id) for course_id in data.course_ids]
             )
     
     return {"message": "Paquete actualizado correctamente"}
@@ -1,7 +1,18 @@
+import asyncio
 import asyncpg
 from fastapi import UploadFile
 import os
 from datetime import datetime, date
+from config.database import db_connection
+from models.pagination import ListQuery
+from utils.json_response import RecordStreamResponse
+from utils.pagination import SqlParams, build_sql, keyset_page, student_search_clause
+from utils.seats import is_seat_violation, seat_error_message
+from utils.uploads import read_upload
+from utils.images import process_voucher
+from controllers.enrollmentController import (
+    ACTIVE_ENROLLMENT_CONSTRAINTS, cascade_package_courses, duplicate_error_message
+)
 
 async def get_payment_plan(enrollment_id: int, db: asyncpg.Connection):
     plan = await db.fetchrow(
@@ -24,44 +35,81 @@ async def get_installments(payment_plan_id: int, db: asyncpg.Connection):
     )
     return [dict(i) for i in installments]
 
-async def upload_voucher(installment_id: int, file: UploadFile, student_id: int, db: asyncpg.Connection):
-    """Upload voucher to Cloudinary"""
+async def upload_voucher(installment_id: int, file: UploadFile, student_id: int):
+    """Upload voucher to Cloudinary.
+    
+    Holds a pooled connection only around its SQL, never during the file read
+    or the Cloudinary upload. The file is read in chunks up to VOUCHER_MAX_BYTES
+    and hashed; an image already stored (same sha256) reuses its URLs. New
+    images are normalized (utils/images.py) and stored with a thumbnail.
+    """
     from config.cloudinary import upload_to_cloudinary
     
     # Verify installment exists and permission
-    inst = await db.fetchrow(
-        """SELECT i.*, pp.enrollment_id, e.student_id 
-           FROM installments i 
-           JOIN payment_plans pp ON i.payment_plan_id = pp.id 
-           JOIN enrollments e ON pp.enrollment_id = e.id 
-           WHERE i.id = $1""",
-        installment_id
-    )
+    async with db_connection() as db:
+        inst = await db.fetchrow(
+            """SELECT i.*, pp.enrollment_id, e.student_id 
+               FROM installments i 
+               JOIN payment_plans pp ON i.payment_plan_id = pp.id 
+               JOIN enrollments e ON pp.enrollment_id = e.id 
+               WHERE i.id = $1""",
+            installment_id
+        )
     
     if not inst:
         return {"error": "Installment no encontrado"}
     
-    # Read file content
-    content = await file.read()
+    # Read file content (413 past the size limit)
+    content, sha256 = await read_upload(file)
     
-    # Generate unique filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"voucher_{installment_id}_{timestamp}"
+    async with db_connection() as db:
+        stored = await db.fetchrow(
+            "SELECT voucher_url, thumb_url FROM voucher_uploads WHERE sha256 = $1", sha256
+        )
     
-    # Upload to Cloudinary
-    try:
-        result = await upload_to_cloudinary(content, filename, folder="Academia-UNI/vouchers")
-        voucher_url = result["url"]
-    except Exception as e:
-        return {"error": f"Error al subir imagen: {str(e)}"}
+    result = None
+    if stored:
+        voucher_url, thumb_url = stored['voucher_url'], stored['thumb_url']
+    else:
+        # Upright, downscaled WEBP plus thumbnail; None for files that are not images (PDF)
+        normalized = await process_voucher(content)
+        
+        # Generate unique filename with timestamp
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"voucher_{installment_id}_{timestamp}"
+        
+        # Upload to Cloudinary
+        try:
+            if normalized:
+                image, thumbnail = normalized
+                result, thumb = await asyncio.gather(
+                    upload_to_cloudinary(image, f"{filename}.webp", folder="Academia-UNI/vouchers"),
+                    upload_to_cloudinary(thumbnail, f"{filename}_thumb.webp", folder="Academia-UNI/vouchers/thumbs")
+                )
+                content, thumb_url = image, thumb["url"]
+            else:
+                result = await upload_to_cloudinary(content, filename, folder="Academia-UNI/vouchers")
+                thumb_url = None
+            voucher_url = result["url"]
+        except Exception as e:
+            return {"error": f"Error al subir imagen: {str(e)}"}
     
     # Update installment - clear rejection_reason and set status to pending
-    await db.execute(
-        "UPDATE installments SET voucher_url = $1, status = $2, rejection_reason = NULL WHERE id = $3",
-        voucher_url, "pending", installment_id
-    )
+    async with db_connection() as db:
+        if result is not None:
+            await db.execute(
+                """INSERT INTO voucher_uploads (sha256, voucher_url, thumb_url, public_id, bytes, first_installment_id)
+                   VALUES ($1, $2, $3, $4, $5, $6) ON CONFLICT (sha256) DO NOTHING""",
+                sha256, voucher_url, thumb_url, result["public_id"], len(content), installment_id
+            )
+        await db.execute(
+            """UPDATE installments
+               SET voucher_url = $1, voucher_thumb_url = $2, status = $3, rejection_reason = NULL
+               WHERE id = $4""",
+            voucher_url, thumb_url, "pending", installment_id
+        )
     
-    return {"message": "Voucher subido con éxito", "voucherUrl": voucher_url}
+    return {"message": "Voucher subido con éxito", "voucherUrl": voucher_url, "voucherThumbUrl": thumb_url}
 
 async def approve_installment(installment_id: int, db: asyncpg.Connection):
     """Approve installment - matches Node.js logic exactly"""
@@ -96,11 +144,21 @@ async def approve_installment(installment_id: int, db: asyncpg.Connection):
     cycle_end_date = None
     
     if pending['cnt'] == 0:
-        # Accept the main enrollment
-        await db.execute(
-            "UPDATE enrollments SET status = $1, accepted_at = CURRENT_TIMESTAMP WHERE id = $2",
-            "aceptado", enrollment_id
-        )
+        # Accept the main enrollment (a previously rejected one needs its seat back)
+        try:
+            async with db.transaction():
+                await db.execute(
+                    "UPDATE enrollments SET status = $1, accepted_at = CURRENT_TIMESTAMP WHERE id = $2",
+                    "aceptado", enrollment_id
+                )
+        except asyncpg.CheckViolationError as exc:
+            if not is_seat_violation(exc):
+                raise
+            return {"error": await seat_error_message(db, exc), "conflict": True}
+        except asyncpg.UniqueViolationError as exc:
+            if exc.constraint_name not in ACTIVE_ENROLLMENT_CONSTRAINTS:
+                raise
+            return {"error": await duplicate_error_message(db, exc), "conflict": True}
         
         # Get enrollment data for cascade
         enr = await db.fetchrow(
@@ -134,13 +192,17 @@ async def approve_installment(installment_id: int, db: asyncpg.Connection):
                     cycle_start_date = cy['start_date']
                     cycle_end_date = cy['end_date']
                 
-                # If package, also accept associated course enrollments
+                # If package, also accept associated course enrollments. Cancelled ones stay
+                # cancelled (reviving them could duplicate an active row, migration 008);
+                # the cascade gives those courses new rows instead
                 await db.execute(
                     """UPDATE enrollments 
                        SET status = 'aceptado', accepted_at = CURRENT_TIMESTAMP
-                       WHERE student_id = $1 AND enrollment_type = 'course' AND package_offering_id = $2""",
+                       WHERE student_id = $1 AND enrollment_type = 'course' AND package_offering_id = $2
+                         AND status <> 'cancelado'""",
                     enr['student_id'], enr['package_offering_id']
                 )
+                await cascade_package_courses([enrollment_id], db)
     
     # Notify parent (try)
     student = await db.fetchrow(
@@ -168,18 +230,9 @@ async def approve_installment(installment_id: int, db: asyncpg.Connection):
         "cycle_end_date": cycle_end_date
     }
 
-async def get_all_installments(status: str, db: asyncpg.Connection):
-    """Get all installments with filters - matches Node.js logic"""
-    # Auto-mark overdue installments
-    try:
-        await db.execute(
-            "UPDATE installments SET status = 'overdue' WHERE status = 'pending' AND due_date < CURRENT_DATE"
-        )
-    except Exception as e:
-        print(f"Auto-overdue update failed: {e}")
-    
-    sql = """SELECT i.*, pp.enrollment_id, e.student_id, s.first_name, s.last_name, s.dni,
-                    COALESCE(c.name, p.name) as item_name, e.enrollment_type, e.status AS enrollment_status
+INSTALLMENTS_SQL = """SELECT i.*, pp.enrollment_id, e.student_id, s.first_name, s.last_name, s.dni,
+                    COALESCE(c.name, p.name) as item_name, e.enrollment_type, e.status AS enrollment_status,
+                    CASE WHEN e.status = 'rechazado' THEN 'rejected' ELSE i.status END AS status_ui
              FROM installments i
              JOIN payment_plans pp ON i.payment_plan_id = pp.id
              JOIN enrollments e ON pp.enrollment_id = e.id
@@ -188,27 +241,83 @@ async def get_all_installments(status: str, db: asyncpg.Connection):
              LEFT JOIN courses c ON co.course_id = c.id
              LEFT JOIN package_offerings po ON e.package_offering_id = po.id
              LEFT JOIN packages p ON po.package_id = p.id"""
-    
-    params = []
-    if status:
-        if status == "rejected":
-            sql += " WHERE e.status = 'rechazado'"
+
+def _installments_where(filters: ListQuery, params: SqlParams):
+    where = []
+    if filters.status:
+        if filters.status == "rejected":
+            where.append("e.status = 'rechazado'")
         else:
-            sql += " WHERE i.status = $1"
-            params.append(status)
-    
-    sql += " ORDER BY i.id DESC"
-    
-    rows = await db.fetch(sql, *params)
-    
-    # Derive status_ui (like Node.js)
-    mapped = []
-    for r in rows:
-        row_dict = dict(r)
-        row_dict['status_ui'] = 'rejected' if row_dict['enrollment_status'] == 'rechazado' else row_dict['status']
-        mapped.append(row_dict)
+            where.append(f"i.status = {params.add(filters.status)}")
+    if filters.cycle_id:
+        cycle = params.add(filters.cycle_id)
+        where.append(f"(co.cycle_id = {cycle} OR po.cycle_id = {cycle})")
+    if filters.enrollment_type:
+        where.append(f"e.enrollment_type = {params.add(filters.enrollment_type)}")
+    if filters.date_from:
+        where.append(f"i.due_date >= {params.add(filters.date_from)}::date")
+    if filters.date_to:
+        where.append(f"i.due_date <= {params.add(filters.date_to)}::date")
+    if filters.q:
+        where.append(student_search_clause(params, filters.q))
+    return where
+
+def installments_query(filters: ListQuery):
+    """SQL and params for the full admin installments list"""
+    params = SqlParams()
+    where = _installments_where(filters, params)
+    return build_sql(INSTALLMENTS_SQL, where, "i.id DESC"), params
+
+OVERDUE_BATCH_SIZE = int(os.getenv("OVERDUE_BATCH_SIZE", "1000"))
+
+async def mark_overdue_installments(db: asyncpg.Connection, batch_size: int = OVERDUE_BATCH_SIZE) -> int:
+    """Scheduled job: pending installments past their due date become overdue.
+
+    Walks the partial index on pending due dates (migration 009), so a run only
+    touches installments that fell due since the last one. Each batch commits
+    on its own; rows locked by a concurrent approval are left for the next run.
+    """
+    marked = 0
+    while True:
+        status_line = await db.execute(
+            """UPDATE installments SET status = 'overdue'
+               WHERE id IN (
+                   SELECT id FROM installments
+                   WHERE status = 'pending' AND due_date < CURRENT_DATE
+                   ORDER BY due_date
+                   LIMIT $1
+                   FOR UPDATE SKIP LOCKED
+               )""",
+            batch_size
+        )
+        updated = int(status_line.split()[-1])
+        marked += updated
+        if updated < batch_size:
+            return marked
+
+async def get_all_installments(filters: ListQuery):
+    """Get all installments with filters - matches Node.js logic.
+
+    Streamed as a JSON array unless filters.page_size asks for a keyset page.
+    """
+    # Overdue marking is the mark_overdue_installments job (services/scheduler.py)
+    # status_ui is derived in SQL (like Node.js)
+    if not filters.page_size:
+        sql, params = installments_query(filters)
+        return await RecordStreamResponse.open(sql, *params)
     
-    return mapped
+    params = SqlParams()
+    where = _installments_where(filters, params)
+    async with db_connection() as db:
+        return await keyset_page(
+            db, INSTALLMENTS_SQL, where, params,
+            order_by="i.id DESC",
+            keyset="(i.id) <",
+            key_types=(int,),
+            row_key=lambda row: (row['id'],),
+            page_size=filters.page_size,
+            cursor=filters.cursor
+        )
 
 async def reject_installment(installment_id: int, reason: str, db: asyncpg.Connection):
     """Reject installment - matches Node.js logic"""
@@ -227,7 +336,7 @@ async def reject_installment(installment_id: int, reason: str, db: asyncpg.Conne
     mark = "overdue" if result['due_date'] and result['due_date'] < date.today() else "pending"
     
     await db.execute(
-        "UPDATE installments SET status = $1, voucher_url = NULL, rejection_reason = $2 WHERE id = $3",
+        "UPDATE installments SET status = $1, voucher_url = NULL, voucher_thumb_url = NULL, rejection_reason = $2 WHERE id = $3",
         mark, reason or None, installment_id
     )
     
@@ -1,8 +1,45 @@
 import asyncpg
 from models.student import StudentCreate, StudentUpdate
+from models.pagination import ListQuery
+from utils.pagination import SqlParams, build_sql, keyset_page, student_search_clause
+from utils.search import search_people
+from middleware.auth import invalidate_principal, revoke_principal_tokens
 
-async def get_all_students(db: asyncpg.Connection):
-    students = await db.fetch("SELECT * FROM students ORDER BY last_name, first_name")
+async def get_all_students(filters: ListQuery, db: asyncpg.Connection):
+    """Students by name; a keyset page when filters.page_size is set"""
+    params = SqlParams()
+    where = []
+    if filters.q:
+        where.append(student_search_clause(params, filters.q))
+    if filters.cycle_id:
+        cycle = params.add(filters.cycle_id)
+        where.append(
+            f"""EXISTS (SELECT 1 FROM enrollments e
+                       LEFT JOIN course_offerings co ON e.course_offering_id = co.id
+                       LEFT JOIN package_offerings po ON e.package_offering_id = po.id
+                       WHERE e.student_id = s.id AND (co.cycle_id = {cycle} OR po.cycle_id = {cycle}))"""
+        )
+    order_by = "s.last_name, s.first_name, s.id"
+    
+    if not filters.page_size:
+        students = await db.fetch(build_sql("SELECT * FROM students s", where, order_by), *params)
+        return [dict(s) for s in students]
+    
+    return await keyset_page(
+        db, "SELECT * FROM students s", where, params,
+        order_by=order_by,
+        keyset="(s.last_name, s.first_name, s.id) >",
+        key_types=(str, str, int),
+        row_key=lambda row: (row['last_name'], row['first_name'], row['id']),
+        page_size=filters.page_size,
+        cursor=filters.cursor
+    )
+
+async def search_students(q: str, limit: int, db: asyncpg.Connection):
+    """Typeahead: students matching a DNI prefix or name, best match first"""
+    students = await search_people(
+        db, "students", "id, dni, first_name, last_name, phone, parent_name, parent_phone", q, limit
+    )
     return [dict(s) for s in students]
 
 async def get_student_by_id(student_id: int, db: asyncpg.Connection):
@@ -12,7 +49,7 @@ async def get_student_by_id(student_id: int, db: asyncpg.Connection):
     return dict(student)
 
 async def create_student(data: StudentCreate, db: asyncpg.Connection):
-    from utils.security import get_password_hash
+    from utils.security import get_password_hash_async
     
     try:
         # Check if DNI already exists
@@ -20,7 +57,7 @@ async def create_student(data: StudentCreate, db: asyncpg.Connection):
         if existing:
             return {"error": "Este DNI ya se encuentra registrado"}
 
-        password_hash = get_password_hash(data.password)
+        password_hash = await get_password_hash_async(data.password)
         result = await db.fetchrow(
             """INSERT INTO students (dni, first_name, last_name, phone, parent_name, parent_phone, password_hash)
                VALUES ($1, $2, $3, $4, $5, $6, $7) RETURNING id""",
@@ -36,11 +73,18 @@ async def update_student(student_id: int, data: StudentUpdate, db: asyncpg.Conne
     values = []
     idx = 1
     
-    for field, value in data.dict(exclude_unset=True).items():
+    password_changed = False
+    changes = data.dict(exclude_unset=True)
+    # The DNI is the username claim of self-contained tokens (utils/security.py)
+    dni_changed = "dni" in changes and changes["dni"] != await db.fetchval(
+        "SELECT dni FROM students WHERE id = $1", student_id
+    )
+    for field, value in changes.items():
         if field == "password" and value:
-            from utils.security import get_password_hash
+            password_changed = True
+            from utils.security import get_password_hash_async
             fields.append(f"password_hash = ${idx}")
-            values.append(get_password_hash(value))
+            values.append(await get_password_hash_async(value))
         else:
             fields.append(f"{field} = ${idx}")
             values.append(value)
@@ -52,8 +96,13 @@ async def update_student(student_id: int, data: StudentUpdate, db: asyncpg.Conne
     values.append(student_id)
     query = f"UPDATE students SET {', '.join(fields)} WHERE id = ${idx}"
     await db.execute(query, *values)
+    if password_changed or dni_changed:
+        await revoke_principal_tokens(db, student_id, "student")
+    else:
+        invalidate_principal(student_id, "student")
     return {"message": "Estudiante actualizado correctamente"}
 
 async def delete_student(student_id: int, db: asyncpg.Connection):
     await db.execute("DELETE FROM students WHERE id = $1", student_id)
+    await revoke_principal_tokens(db, student_id, "student")
     return {"message": "Estudiante eliminado correctamente"}
@@ -1,5 +1,7 @@
 import asyncpg
 from models.teacher import TeacherCreate, TeacherUpdate, AttendanceCreate
+from middleware.auth import revoke_principal_tokens
+from utils.search import search_people
 
 async def get_all_teachers(db: asyncpg.Connection):
     teachers = await db.fetch("SELECT * FROM teachers ORDER BY last_name, first_name")
@@ -11,6 +13,18 @@ async def get_all_teachers(db: asyncpg.Connection):
         result.append(teacher_dict)
     return result
 
+async def search_teachers(q: str, limit: int, db: asyncpg.Connection):
+    """Typeahead: teachers matching a DNI prefix or name, best match first"""
+    teachers = await search_people(
+        db, "teachers", "id, dni, first_name, last_name, phone, email, specialization", q, limit
+    )
+    result = []
+    for t in teachers:
+        teacher_dict = dict(t)
+        teacher_dict['name'] = f"{t['first_name']} {t['last_name']}"
+        result.append(teacher_dict)
+    return result
+
 async def get_teacher_by_id(teacher_id: int, db: asyncpg.Connection):
     teacher = await db.fetchrow("SELECT * FROM teachers WHERE id = $1", teacher_id)
     if not teacher:
@@ -18,18 +32,20 @@ async def get_teacher_by_id(teacher_id: int, db: asyncpg.Connection):
     return dict(teacher)
 
 async def create_teacher(data: TeacherCreate, db: asyncpg.Connection):
-    from utils.security import get_password_hash
+    from utils.security import get_password_hash_async
     
     # Check if DNI already exists
     existing = await db.fetchrow("SELECT id FROM teachers WHERE dni = $1", data.dni)
     if existing:
         return {"error": "Este DNI ya se encuentra registrado"}
     
+    password_hash = await get_password_hash_async(data.dni)
+    
     # Create user for teacher
     user_result = await db.fetchrow(
         """INSERT INTO users (username, password_hash, role, related_id)
            VALUES ($1, $2, 'teacher', NULL) RETURNING id""",
-        data.dni, get_password_hash(data.dni)
+        data.dni, password_hash
     )
     user_id = user_result['id']
     
@@ -66,20 +82,29 @@ async def update_teacher(teacher_id: int, data: TeacherUpdate, db: asyncpg.Conne
 
 async def delete_teacher(teacher_id: int, db: asyncpg.Connection):
     """Delete teacher - matches Node.js logic"""
+    users = await db.fetch(
+        "SELECT id, role FROM users WHERE related_id = $1 AND role = 'teacher'",
+        teacher_id
+    )
     await db.execute("DELETE FROM teachers WHERE id = $1", teacher_id)
+    for user in users:
+        await revoke_principal_tokens(db, user['id'], user['role'])
     return {"message": "Profesor eliminado correctamente"}
 
 async def reset_teacher_password(teacher_id: int, db: asyncpg.Connection):
-    from utils.security import get_password_hash
+    from utils.security import get_password_hash_async
     
     teacher = await db.fetchrow("SELECT dni FROM teachers WHERE id = $1", teacher_id)
     if not teacher:
         return None
     
-    await db.execute(
-        "UPDATE users SET password_hash = $1 WHERE username = $2",
-        get_password_hash(teacher['dni']), teacher['dni']
+    password_hash = await get_password_hash_async(teacher['dni'])
+    users = await db.fetch(
+        "UPDATE users SET password_hash = $1 WHERE username = $2 RETURNING id, role",
+        password_hash, teacher['dni']
     )
+    for user in users:
+        await revoke_principal_tokens(db, user['id'], user['role'])
     return {"message": "Contraseña reseteada al DNI del docente"}
 
 async def get_teacher_students(teacher_id: int, db: asyncpg.Connection):
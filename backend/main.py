@@ -1,6 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from config.database import get_db_pool, close_db_pool
+from migrations.runner import check_migrations
+from services.scheduler import scheduler
+from utils import query_stats
+from utils.uploads import VOUCHER_MAX_BYTES, MULTIPART_OVERHEAD_BYTES, too_large
+from utils.images import shutdown_image_pool
 from datetime import datetime
 import os
 
@@ -37,6 +43,18 @@ if frontend_url:
     if frontend_url.endswith("/"):
         allowed_origins.append(frontend_url[:-1])
 
+# Oversized voucher uploads get 413 before their body is read, see utils/uploads.py
+# (declared before CORS so the 413 still carries CORS headers)
+@app.middleware("http")
+async def reject_oversized_upload(request: Request, call_next):
+    if request.method == "POST" and request.url.path.startswith("/api/payments/upload"):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and \
+                int(content_length) > VOUCHER_MAX_BYTES + MULTIPART_OVERHEAD_BYTES:
+            error = too_large(VOUCHER_MAX_BYTES)
+            return JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+    return await call_next(request)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -45,8 +63,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request query counter (N+1 detector), see utils/query_stats.py
+@app.middleware("http")
+async def count_queries(request: Request, call_next):
+    stats = query_stats.start_request(f"{request.method} {request.url.path}")
+    response = await call_next(request)
+    route = request.scope.get("route")
+    route_key = f"{request.method} {route.path}" if route else stats.route
+    if stats.count:
+        query_stats.finish_request(stats, route_key)
+    response.headers["X-DB-Queries"] = str(stats.count)
+    return response
+
 # Configure Cloudinary
-from config.cloudinary import configure_cloudinary
+from config.cloudinary import configure_cloudinary, close_cloudinary_client
 configure_cloudinary()
 
 # Include routers
@@ -64,11 +94,16 @@ app.include_router(notifications.router, prefix="/api")
 
 @app.on_event("startup")
 async def startup():
-    await get_db_pool()
+    pool = await get_db_pool()
     print("✓ Database pool created")
+    await check_migrations(pool)
+    scheduler.start()
 
 @app.on_event("shutdown")
 async def shutdown():
+    await scheduler.stop()
+    await close_cloudinary_client()
+    shutdown_image_pool()
     await close_db_pool()
     print("✓ Database pool closed")
 
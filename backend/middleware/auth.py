@@ -1,60 +1,107 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from utils.security import decode_token
-from config.database import get_db
-import asyncpg
+from utils.cache import TTLCache
+from utils.token_versions import token_versions, principal_kind
+from config.database import db_connection
+import os
 
 security = HTTPBearer()
 
+# Resolved principals keyed by (user_id, role) so authenticated requests
+# don't need a round trip to Postgres on every call
+principal_cache = TTLCache(
+    max_size=int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+)
+
+def invalidate_principal(user_id: int, role: str):
+    """Drop a cached principal after its row changed or was deleted"""
+    principal_cache.invalidate((user_id, role))
+
+async def revoke_principal_tokens(db, user_id: int, role: str):
+    """Revoke every token issued to this principal (password reset, deletion)"""
+    await token_versions.bump(db, principal_kind(role), user_id)
+    invalidate_principal(user_id, role)
+
+async def _load_principal(user_id: int, role: str):
+    """Legacy tokens only carry id/role, so resolve the rest from Postgres"""
+    cached = principal_cache.get((user_id, role))
+    if cached is not None:
+        return dict(cached)
+
+    async with db_connection() as db:
+        # If student, they might not be in users table
+        if role == "student":
+            student = await db.fetchrow(
+                "SELECT id, dni FROM students WHERE id = $1",
+                user_id
+            )
+            if student:
+                principal = {
+                    "id": student['id'],
+                    "username": student['dni'],
+                    "role": "student",
+                    "related_id": None
+                }
+                principal_cache.set((user_id, role), principal)
+                return dict(principal)
+
+        # Otherwise check users table
+        user = await db.fetchrow(
+            "SELECT id, username, role, related_id FROM users WHERE id = $1",
+            user_id
+        )
+
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+
+    principal = dict(user)
+    principal_cache.set((user_id, role), principal)
+    return dict(principal)
+
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: asyncpg.Connection = Depends(get_db)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = decode_token(token)
-    
+
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
         )
-    
+
     user_id = payload.get("id")
     role = payload.get("role")
-    
+
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload"
         )
-    
-    # If student, they might not be in users table
-    if role == "student":
-        student = await db.fetchrow(
-            "SELECT id, dni FROM students WHERE id = $1",
-            user_id
-        )
-        if student:
-            return {
-                "id": student['id'],
-                "username": student['dni'],
-                "role": "student",
-                "related_id": None
-            }
-    
-    # Otherwise check users table
-    user = await db.fetchrow(
-        "SELECT id, username, role, related_id FROM users WHERE id = $1",
-        user_id
-    )
-    
-    if user is None:
+
+    # Tokens issued before versioning count as version 0
+    await token_versions.ensure_fresh()
+    if not token_versions.is_current(principal_kind(role), user_id, payload.get("ver", 0)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
+            detail="Token revoked"
         )
-    
-    return dict(user)
+
+    # Self-contained token: authorize from the claims, no query needed
+    if "ver" in payload and "username" in payload:
+        return {
+            "id": user_id,
+            "username": payload["username"],
+            "role": role,
+            "related_id": payload.get("related_id")
+        }
+
+    return await _load_principal(user_id, role)
 
 def require_role(allowed_roles: list):
     def role_checker(current_user: dict = Depends(get_current_user)):
@@ -0,0 +1,8 @@
+-- Token versions used to revoke JWTs (utils/token_versions.py)
+CREATE TABLE IF NOT EXISTS auth_token_versions (
+    kind TEXT NOT NULL,
+    principal_id INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (kind, principal_id)
+);
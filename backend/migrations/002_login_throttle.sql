@@ -0,0 +1,12 @@
+-- Shared login throttle counters for LOGIN_THROTTLE_BACKEND=postgres (utils/rate_limit.py)
+CREATE TABLE IF NOT EXISTS login_throttle_failures (
+    key TEXT NOT NULL,
+    failed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_login_throttle_failures_key
+    ON login_throttle_failures (key, failed_at);
+CREATE TABLE IF NOT EXISTS login_throttle_lockouts (
+    key TEXT PRIMARY KEY,
+    locked_until TIMESTAMPTZ NOT NULL,
+    lockout_count INTEGER NOT NULL DEFAULT 0
+);
@@ -0,0 +1,28 @@
+-- migrate: no-transaction
+-- Indexes for the predicates the controllers filter on. Built CONCURRENTLY so
+-- production tables stay writable; scripts/check_indexes.py verifies each one
+-- with EXPLAIN.
+
+-- Student enrollment lists and duplicate checks: student_id = $1 AND status ...
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_enrollments_student_status
+    ON enrollments (student_id, status);
+
+-- Package cascades and package rosters: package_offering_id = $1
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_enrollments_package_offering
+    ON enrollments (package_offering_id);
+
+-- Installments per payment plan, counted by status on approve
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_installments_plan_status
+    ON installments (payment_plan_id, status);
+
+-- Attendance by schedule and day
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attendance_schedule_date
+    ON attendance (schedule_id, date);
+
+-- Notification history, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notifications_log_sent_at
+    ON notifications_log (sent_at);
+
+-- Recent payments (paid_at >= NOW() - INTERVAL '7 days')
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_installments_paid_at
+    ON installments (paid_at);
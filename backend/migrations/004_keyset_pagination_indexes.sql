@@ -0,0 +1,21 @@
+-- migrate: no-transaction
+-- Keyset pagination indexes: one per admin list, matching its ORDER BY so each
+-- page is a bounded index range scan (see utils/pagination.py).
+
+-- /enrollments/admin: ORDER BY registered_at DESC, id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_enrollments_registered_keyset
+    ON enrollments (registered_at DESC, id DESC);
+
+-- /payments?status=...: ORDER BY i.id DESC within one status
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_installments_status_id
+    ON installments (status, id DESC);
+
+-- /students: ORDER BY last_name, first_name, id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_students_name_keyset
+    ON students (last_name, first_name, id);
+
+-- /admin/notifications: ORDER BY sent_at DESC, id DESC; supersedes the
+-- single-column index from 003
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notifications_log_sent_keyset
+    ON notifications_log (sent_at DESC, id DESC);
+DROP INDEX CONCURRENTLY IF EXISTS idx_notifications_log_sent_at;
@@ -0,0 +1,17 @@
+-- migrate: no-transaction
+-- Typeahead search over students and teachers (utils/search.py): DNI prefix
+-- through a pattern-ops btree, names through trigram GIN indexes on the same
+-- full-name expression the queries use.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_students_dni_prefix
+    ON students (dni text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_students_full_name_trgm
+    ON students USING gin ((first_name || ' ' || last_name) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_teachers_dni_prefix
+    ON teachers (dni text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_teachers_full_name_trgm
+    ON teachers USING gin ((first_name || ' ' || last_name) gin_trgm_ops);
@@ -0,0 +1,89 @@
+-- Seat accounting for course and package offerings (utils/seats.py).
+--
+-- seats_taken is maintained by a trigger on enrollments, so every path that
+-- inserts, deletes or changes the status of an enrollment (including FK
+-- cascades from deleting a student) keeps it exact without COUNT(*).
+-- A seat is held by a direct enrollment that is 'pendiente' or 'aceptado':
+-- course rows created by a package cascade are covered by the package's seat.
+--
+-- Taking a seat is a conditional UPDATE on the offering row, which serializes
+-- concurrent enrollments on that row: the last seat can only be taken once.
+-- A full offering raises check_violation with constraint
+-- course_offering_seats / package_offering_seats and the offering id as DETAIL.
+
+ALTER TABLE course_offerings ADD COLUMN IF NOT EXISTS seats_taken INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE package_offerings ADD COLUMN IF NOT EXISTS seats_taken INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION enrollments_track_seats() RETURNS trigger AS $$
+DECLARE
+    old_course INTEGER;
+    old_package INTEGER;
+    new_course INTEGER;
+    new_package INTEGER;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IN ('pendiente', 'aceptado') THEN
+        IF OLD.enrollment_type = 'package' THEN
+            old_package := OLD.package_offering_id;
+        ELSIF OLD.package_offering_id IS NULL THEN
+            old_course := OLD.course_offering_id;
+        END IF;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IN ('pendiente', 'aceptado') THEN
+        IF NEW.enrollment_type = 'package' THEN
+            new_package := NEW.package_offering_id;
+        ELSIF NEW.package_offering_id IS NULL THEN
+            new_course := NEW.course_offering_id;
+        END IF;
+    END IF;
+
+    -- Release before taking, so moving an enrollment between offerings works
+    IF old_course IS DISTINCT FROM new_course AND old_course IS NOT NULL THEN
+        UPDATE course_offerings SET seats_taken = GREATEST(seats_taken - 1, 0) WHERE id = old_course;
+    END IF;
+    IF old_package IS DISTINCT FROM new_package AND old_package IS NOT NULL THEN
+        UPDATE package_offerings SET seats_taken = GREATEST(seats_taken - 1, 0) WHERE id = old_package;
+    END IF;
+
+    IF new_course IS DISTINCT FROM old_course AND new_course IS NOT NULL THEN
+        UPDATE course_offerings SET seats_taken = seats_taken + 1
+        WHERE id = new_course AND (capacity IS NULL OR seats_taken < capacity);
+        IF NOT FOUND AND EXISTS (SELECT 1 FROM course_offerings WHERE id = new_course) THEN
+            RAISE EXCEPTION 'course offering % is full', new_course
+                USING ERRCODE = 'check_violation', CONSTRAINT = 'course_offering_seats', DETAIL = new_course;
+        END IF;
+    END IF;
+    IF new_package IS DISTINCT FROM old_package AND new_package IS NOT NULL THEN
+        UPDATE package_offerings SET seats_taken = seats_taken + 1
+        WHERE id = new_package AND (capacity IS NULL OR seats_taken < capacity);
+        IF NOT FOUND AND EXISTS (SELECT 1 FROM package_offerings WHERE id = new_package) THEN
+            RAISE EXCEPTION 'package offering % is full', new_package
+                USING ERRCODE = 'check_violation', CONSTRAINT = 'package_offering_seats', DETAIL = new_package;
+        END IF;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS enrollments_track_seats ON enrollments;
+CREATE TRIGGER enrollments_track_seats
+    AFTER INSERT OR DELETE OR UPDATE OF status, enrollment_type, course_offering_id, package_offering_id
+    ON enrollments
+    FOR EACH ROW EXECUTE FUNCTION enrollments_track_seats();
+
+-- Backfill from current enrollments (offerings oversold before enforcement keep
+-- their real count; they just accept no new seats until enough are released)
+UPDATE course_offerings co SET seats_taken = (
+    SELECT COUNT(*) FROM enrollments e
+    WHERE e.course_offering_id = co.id
+      AND e.enrollment_type = 'course'
+      AND e.package_offering_id IS NULL
+      AND e.status IN ('pendiente', 'aceptado')
+);
+UPDATE package_offerings po SET seats_taken = (
+    SELECT COUNT(*) FROM enrollments e
+    WHERE e.package_offering_id = po.id
+      AND e.enrollment_type = 'package'
+      AND e.status IN ('pendiente', 'aceptado')
+);
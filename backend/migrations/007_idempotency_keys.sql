@@ -0,0 +1,19 @@
+-- Stored responses for requests sent with an Idempotency-Key header (utils/idempotency.py).
+--
+-- A row is claimed before the request runs (response_body NULL, locked_until
+-- set) and completed with the response. Retries with the same key get the
+-- stored response back until expires_at. Expired rows are deleted in small
+-- batches along the expires_at index, never with a full scan.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    status_code INTEGER,
+    response_body TEXT,
+    locked_until TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (scope, key)
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at
+    ON idempotency_keys (expires_at);
@@ -0,0 +1,36 @@
+-- migrate: no-transaction
+-- One active (not 'cancelado') enrollment per student and offering, enforced
+-- by partial unique indexes instead of read-then-insert checks:
+--   direct course rows   (student_id, course_offering_id)
+--   package rows         (student_id, package_offering_id)
+--   package course rows  (student_id, course_offering_id, package_offering_id)
+-- Cancelled rows stay out of the indexes, so history and re-enrollment work.
+--
+-- The indexes cannot be built while active duplicates exist, and a failed
+-- CONCURRENTLY build would leave an invalid index behind. Resolve duplicates
+-- online first with scripts/cleanup_duplicates.py (it cancels them in small
+-- batches); this migration only checks that none are left and stops otherwise.
+-- The DO block keeps its inner statements off line ends so the runner's
+-- statement splitter treats it as one statement.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM enrollments
+        WHERE status <> 'cancelado'
+        GROUP BY student_id, enrollment_type, course_offering_id, package_offering_id
+        HAVING COUNT(*) > 1
+    ) THEN
+        RAISE EXCEPTION 'Active duplicate enrollments exist; run scripts/cleanup_duplicates.py, then migrate again'; END IF; END
+$$;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_enrollments_active_course
+    ON enrollments (student_id, course_offering_id)
+    WHERE enrollment_type = 'course' AND package_offering_id IS NULL AND status <> 'cancelado';
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_enrollments_active_package
+    ON enrollments (student_id, package_offering_id)
+    WHERE enrollment_type = 'package' AND status <> 'cancelado';
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_enrollments_active_package_course
+    ON enrollments (student_id, course_offering_id, package_offering_id)
+    WHERE enrollment_type = 'course' AND package_offering_id IS NOT NULL AND status <> 'cancelado';
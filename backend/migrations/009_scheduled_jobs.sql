@@ -0,0 +1,17 @@
+-- migrate: no-transaction
+-- Background jobs (services/scheduler.py): one row per job with its last run,
+-- read by every worker to decide when the job is due again.
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    name TEXT PRIMARY KEY,
+    last_started_at TIMESTAMPTZ,
+    last_finished_at TIMESTAMPTZ,
+    last_status TEXT,
+    last_error TEXT,
+    last_result INTEGER,
+    run_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Overdue marking walks only pending installments by due date, so each run
+-- touches just the ones that became overdue since the previous run
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_installments_pending_due_date
+    ON installments (due_date) WHERE status = 'pending';
@@ -0,0 +1,10 @@
+-- Stored voucher files by content hash (controllers/paymentController.upload_voucher):
+-- uploading the same image again reuses its URL instead of storing a new copy.
+CREATE TABLE IF NOT EXISTS voucher_uploads (
+    sha256 TEXT PRIMARY KEY,
+    voucher_url TEXT NOT NULL,
+    public_id TEXT,
+    bytes INTEGER NOT NULL,
+    first_installment_id INTEGER,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
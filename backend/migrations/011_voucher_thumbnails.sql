@@ -0,0 +1,3 @@
+-- Thumbnails of normalized voucher images (utils/images.py) for the admin payments list
+ALTER TABLE installments ADD COLUMN IF NOT EXISTS voucher_thumb_url TEXT;
+ALTER TABLE voucher_uploads ADD COLUMN IF NOT EXISTS thumb_url TEXT;
@@ -0,0 +1,158 @@
+"""
+Versioned schema migrations.
+
+Migrations are the NNN_description.sql files next to this module, applied in
+order and recorded in schema_migrations. Each file runs in one transaction
+unless its first line is "-- migrate: no-transaction" (needed for
+CREATE INDEX CONCURRENTLY); those files run statement by statement and must be
+idempotent (IF NOT EXISTS) so a failed run can simply be retried.
+
+A session advisory lock serializes runners, so several workers starting at the
+same time apply each migration once. Runners that find the lock taken poll
+pg_try_advisory_lock between sleeps instead of blocking in pg_advisory_lock:
+a blocked statement holds a snapshot, and CREATE INDEX CONCURRENTLY in the
+migrating session waits for every older snapshot, which would deadlock the two.
+A no-transaction migration that leaves an INVALID index behind is never
+recorded as applied, since IF NOT EXISTS would skip that index on a retry.
+"""
+import asyncio
+import hashlib
+import os
+import re
+from pathlib import Path
+
+MIGRATIONS_DIR = Path(__file__).parent
+
+# Apply pending migrations on startup; when false, startup only reports them
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+
+_FILE_PATTERN = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+_NO_TRANSACTION = "-- migrate: no-transaction"
+_LOCK_KEY = 7_340_211  # arbitrary, shared by every runner
+# How often and for how long a runner waits for another one to finish
+MIGRATION_LOCK_POLL_SECONDS = float(os.getenv("MIGRATION_LOCK_POLL_SECONDS", "1"))
+MIGRATION_LOCK_TIMEOUT_SECONDS = float(os.getenv("MIGRATION_LOCK_TIMEOUT_SECONDS", "900"))
+
+INVALID_INDEXES_SQL = """
+    SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE NOT i.indisvalid
+"""
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+class Migration:
+    def __init__(self, path: Path):
+        match = _FILE_PATTERN.match(path.name)
+        self.version = int(match.group(1))
+        self.name = match.group(2)
+        self.path = path
+        self.sql = path.read_text(encoding="utf-8")
+        self.checksum = hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+        self.transactional = not self.sql.lstrip().startswith(_NO_TRANSACTION)
+
+    def statements(self):
+        """Split on ';' at end of line; migration files keep one statement per block"""
+        body = "\n".join(
+            line for line in self.sql.splitlines() if not line.strip().startswith("--")
+        )
+        return [stmt.strip() for stmt in re.split(r";\s*$", body, flags=re.M) if stmt.strip()]
+
+def load_migrations():
+    migrations = [
+        Migration(path) for path in sorted(MIGRATIONS_DIR.glob("*.sql"))
+        if _FILE_PATTERN.match(path.name)
+    ]
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration version numbers in migrations/")
+    return sorted(migrations, key=lambda m: m.version)
+
+async def applied_migrations(conn):
+    await conn.execute(CREATE_TABLE_SQL)
+    rows = await conn.fetch("SELECT version, checksum FROM schema_migrations")
+    return {row["version"]: row["checksum"] for row in rows}
+
+async def pending_migrations(conn):
+    applied = await applied_migrations(conn)
+    pending = []
+    for migration in load_migrations():
+        if migration.version not in applied:
+            pending.append(migration)
+        elif applied[migration.version] != migration.checksum:
+            print(f"⚠️  Migration {migration.path.name} changed after being applied")
+    return pending
+
+async def _apply(conn, migration: Migration):
+    if migration.transactional:
+        async with conn.transaction():
+            await conn.execute(migration.sql)
+            await _record(conn, migration)
+        return
+    for statement in migration.statements():
+        try:
+            await conn.execute(statement)
+        except Exception:
+            await _report_invalid_indexes(conn)
+            raise
+    # A failed CONCURRENTLY build leaves an INVALID index that IF NOT EXISTS skips
+    # on the next run, so the statements above can all succeed with one in place
+    if await _report_invalid_indexes(conn):
+        raise RuntimeError(f"Migration {migration.path.name} left invalid indexes; not recording it")
+    await _record(conn, migration)
+
+async def _report_invalid_indexes(conn) -> bool:
+    invalid = await conn.fetch(INVALID_INDEXES_SQL)
+    if invalid:
+        names = ", ".join(row["relname"] for row in invalid)
+        print(f"❌ Invalid indexes left behind ({names}); DROP INDEX CONCURRENTLY them before retrying")
+    return bool(invalid)
+
+async def _record(conn, migration: Migration):
+    await conn.execute(
+        "INSERT INTO schema_migrations (version, name, checksum) VALUES ($1, $2, $3)",
+        migration.version, migration.name, migration.checksum
+    )
+
+async def _acquire_lock(conn):
+    """Take the runner lock, polling without holding a snapshot while another runner works"""
+    waited = 0.0
+    while not await conn.fetchval("SELECT pg_try_advisory_lock($1)", _LOCK_KEY):
+        if waited == 0:
+            print("⏳ Another process is applying migrations, waiting...")
+        if waited >= MIGRATION_LOCK_TIMEOUT_SECONDS:
+            raise RuntimeError(f"Migration lock still taken after {waited:.0f}s")
+        await asyncio.sleep(MIGRATION_LOCK_POLL_SECONDS)
+        waited += MIGRATION_LOCK_POLL_SECONDS
+
+async def apply_migrations(conn):
+    """Apply every pending migration in order; returns the ones applied"""
+    await _acquire_lock(conn)
+    try:
+        # Re-read under the lock: another worker may have just applied them
+        pending = await pending_migrations(conn)
+        for migration in pending:
+            print(f"→ Applying migration {migration.path.name}")
+            await _apply(conn, migration)
+        return pending
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", _LOCK_KEY)
+
+async def check_migrations(pool):
+    """Startup hook: apply pending migrations, or just report them"""
+    async with pool.acquire() as conn:
+        if DB_AUTO_MIGRATE:
+            applied = await apply_migrations(conn)
+            if applied:
+                print(f"✓ Applied {len(applied)} migration(s)")
+            return
+        pending = await pending_migrations(conn)
+    if pending:
+        names = ", ".join(m.path.name for m in pending)
+        print(f"⚠️  Pending migrations: {names} (run: python scripts/migrate.py)")
@@ -12,6 +12,10 @@ class EnrollmentStatusUpdate(BaseModel):
     enrollment_id: int
     status: str
 
+class EnrollmentBulkStatusUpdate(BaseModel):
+    enrollment_ids: List[int]
+    status: str
+
 class PackageCreate(BaseModel):
     name: str
     description: Optional[str] = None
@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import date
+
+MAX_PAGE_SIZE = 200
+
+class ListQuery(BaseModel):
+    """Server-side filters and keyset pagination shared by the admin lists.
+
+    Without page_size an endpoint keeps returning the whole (filtered) list;
+    with it the response is {"items", "next_cursor", "total_estimate"} and the
+    next page is requested with cursor=<next_cursor>.
+    """
+    cycle_id: Optional[int] = None
+    status: Optional[str] = None
+    enrollment_type: Optional[str] = None  # 'course' or 'package'
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    q: Optional[str] = Field(None, max_length=100)  # DNI prefix or name
+    page_size: Optional[int] = Field(None, ge=1, le=MAX_PAGE_SIZE)
+    cursor: Optional[str] = None
+
+class NotificationListQuery(ListQuery):
+    student_id: Optional[int] = None
+    type: Optional[str] = None
+    limit: int = 50  # without page_size: newest N notifications
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from typing import Annotated
+from models.pagination import NotificationListQuery
+from utils.pagination import list_response
 from middleware.auth import require_role
 from config.database import get_db
 import asyncpg
@@ -7,8 +10,8 @@ import controllers.adminController as adminController
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 @router.get("/dashboard", dependencies=[Depends(require_role(["admin"]))])
-async def get_dashboard(db: asyncpg.Connection = Depends(get_db)):
-    return await adminController.get_dashboard_data(db)
+async def get_dashboard():
+    return await adminController.get_dashboard_data()
 
 @router.get("/analytics", dependencies=[Depends(require_role(["admin"]))])
 async def get_analytics(
@@ -20,17 +23,30 @@ async def get_analytics(
 
 @router.get("/notifications", dependencies=[Depends(require_role(["admin"]))])
 async def get_notifications(
-    student_id: int = None,
-    type: str = None,
-    limit: int = 50,
+    filters: Annotated[NotificationListQuery, Query()],
     db: asyncpg.Connection = Depends(get_db)
 ):
-    return await adminController.get_notifications(student_id, type, limit, db)
+    return list_response(await adminController.get_notifications(
+        filters.student_id, filters.type, filters.limit, filters, db
+    ))
 
 @router.get("/stats", dependencies=[Depends(require_role(["admin"]))])
 async def get_stats(db: asyncpg.Connection = Depends(get_db)):
     return await adminController.get_general_stats(db)
 
+@router.get("/metrics", dependencies=[Depends(require_role(["admin"]))])
+async def get_metrics():
+    return adminController.get_runtime_metrics()
+
+@router.get("/jobs", dependencies=[Depends(require_role(["admin"]))])
+async def get_jobs(db: asyncpg.Connection = Depends(get_db)):
+    return await adminController.get_scheduled_jobs(db)
+
+@router.get("/db-pool", dependencies=[Depends(require_role(["admin"]))])
+async def get_db_pool_stats():
+    from config.database import get_pool_stats
+    return get_pool_stats()
+
 @router.get("/attendance-notifications", dependencies=[Depends(require_role(["admin"]))])
 async def get_attendance_notifications(
     cycle_id: int,
@@ -41,13 +57,9 @@ async def get_attendance_notifications(
     return await adminController.get_attendance_absences(cycle_id, date, group, db)
 
 @router.post("/send-attendance-notifications", dependencies=[Depends(require_role(["admin"]))])
-async def send_attendance_notifications(
-    data: dict,
-    db: asyncpg.Connection = Depends(get_db)
-):
+async def send_attendance_notifications(data: dict):
     return await adminController.send_attendance_notifications(
         data['cycle_id'],
         data['date'],
-        data['group_label'],
-        db
+        data['group_label']
     )
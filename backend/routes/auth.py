@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from models.student import StudentCreate
 from models.user import UserLogin
 from config.database import get_db
+from utils.rate_limit import get_client_ip
 import asyncpg
 import controllers.authController as authController
 
@@ -15,8 +16,14 @@ async def register(user: StudentCreate, db: asyncpg.Connection = Depends(get_db)
     return result
 
 @router.post("/login")
-async def login(credentials: UserLogin, db: asyncpg.Connection = Depends(get_db)):
-    result = await authController.login_user(credentials, db)
+async def login(credentials: UserLogin, request: Request, db: asyncpg.Connection = Depends(get_db)):
+    result = await authController.login_user(credentials, db, get_client_ip(request))
+    if "retry_after" in result:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=result["error"],
+            headers={"Retry-After": str(result["retry_after"])}
+        )
     if "error" in result:
         raise HTTPException(status_code=401, detail=result["error"])
     return result
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from models.enrollment import EnrollmentCreate, EnrollmentStatusUpdate
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from typing import Annotated
+from models.pagination import ListQuery
+from utils.pagination import list_response
+from utils.seats import get_availability as get_seat_availability
+from utils import idempotency
+from models.enrollment import EnrollmentCreate, EnrollmentStatusUpdate, EnrollmentBulkStatusUpdate
 from middleware.auth import get_current_user, require_role
-from config.database import get_db
+from config.database import get_db, get_db_tx
 import asyncpg
 import controllers.enrollmentController as enrollmentController
 
@@ -34,11 +39,18 @@ async def get_by_offering(
         raise HTTPException(status_code=400, detail="Faltan parámetros: type e id")
     return await enrollmentController.get_enrollments_by_offering(type, id, status, db)
 
+# Seats left per offering, read from the maintained counters; public like the catalog
+@router.get("/availability")
+async def get_availability(response: Response, cycle_id: int = None, db: asyncpg.Connection = Depends(get_db)):
+    response.headers["Cache-Control"] = "public, max-age=5"
+    return await get_seat_availability(cycle_id, db)
+
 @router.post("", status_code=status.HTTP_201_CREATED)
 async def create_enrollment(
     enrollment: EnrollmentCreate,
     current_user: dict = Depends(get_current_user),
-    db: asyncpg.Connection = Depends(get_db)
+    idempotency_key: str = Header(None, alias="Idempotency-Key"),
+    db: asyncpg.Connection = Depends(get_db_tx)
 ):
     student_id = current_user.get("id")
     if not student_id:
@@ -47,18 +59,36 @@ async def create_enrollment(
     if not enrollment.items or len(enrollment.items) == 0:
         raise HTTPException(status_code=400, detail="No se enviaron items para matricular")
     
+    # Claimed inside the request transaction: rolled back with it on errors
+    scope = f"student:{student_id}:enrollments"
+    replay = await idempotency.begin(
+        db, scope, idempotency_key, idempotency.fingerprint(enrollment.model_dump())
+    )
+    if replay:
+        return replay
+    
     result = await enrollmentController.create_enrollment(student_id, enrollment, db)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
+    await idempotency.complete(db, scope, idempotency_key, status.HTTP_201_CREATED, result)
     return result
 
 @router.put("/status", dependencies=[Depends(require_role(["admin"]))])
-async def update_status(update: EnrollmentStatusUpdate, db: asyncpg.Connection = Depends(get_db)):
+async def update_status(update: EnrollmentStatusUpdate, db: asyncpg.Connection = Depends(get_db_tx)):
     result = await enrollmentController.update_enrollment_status(update, db)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     return result
 
+@router.put("/status/bulk", dependencies=[Depends(require_role(["admin"]))])
+async def update_status_bulk(update: EnrollmentBulkStatusUpdate, db: asyncpg.Connection = Depends(get_db_tx)):
+    if not update.enrollment_ids:
+        raise HTTPException(status_code=400, detail="No se enviaron matrículas")
+    result = await enrollmentController.update_enrollment_status_bulk(update, db)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
 @router.post("/cancel", dependencies=[Depends(require_role(["student"]))])
 async def cancel_enrollment(
     data: dict,
@@ -80,8 +110,8 @@ async def cancel_enrollment(
     return result
 
 @router.get("/admin", dependencies=[Depends(require_role(["admin"]))])
-async def get_admin_enrollments(db: asyncpg.Connection = Depends(get_db)):
-    return await enrollmentController.get_admin_enrollments(db)
+async def get_admin_enrollments(filters: Annotated[ListQuery, Query()]):
+    return list_response(await enrollmentController.get_admin_enrollments(filters))
 
 @router.delete("/{enrollment_id}", dependencies=[Depends(require_role(["admin"]))])
 async def delete_enrollment(enrollment_id: int, db: asyncpg.Connection = Depends(get_db)):
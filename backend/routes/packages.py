@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from models.enrollment import PackageCreate, PackageUpdate, PackageOfferingCreate
 from middleware.auth import require_role
-from config.database import get_db
+from config.database import get_db, get_db_tx
 import asyncpg
 import controllers.packageController as packageController
 
@@ -16,7 +16,7 @@ async def create_package(package: PackageCreate, db: asyncpg.Connection = Depend
     return await packageController.create_package(package, db)
 
 @router.put("/{package_id}", dependencies=[Depends(require_role(["admin"]))])
-async def update_package(package_id: int, package: PackageUpdate, db: asyncpg.Connection = Depends(get_db)):
+async def update_package(package_id: int, package: PackageUpdate, db: asyncpg.Connection = Depends(get_db_tx)):
     return await packageController.update_package(package_id, package, db)
 
 @router.delete("/{package_id}", dependencies=[Depends(require_role(["admin"]))])
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status, UploadFile, File, Form
+from typing import Annotated
+from models.pagination import ListQuery
+from utils.pagination import list_response
 from middleware.auth import require_role, get_current_user
-from config.database import get_db
+from config.database import get_db, get_db_tx, db_connection
+from utils import idempotency
 import asyncpg
 import controllers.paymentController as paymentController
 
@@ -8,8 +12,8 @@ router = APIRouter(prefix="/payments", tags=["payments"])
 
 # Get all installments with optional status filter (like Node.js)
 @router.get("", dependencies=[Depends(require_role(["admin"]))])
-async def get_payments(status: str = None, db: asyncpg.Connection = Depends(get_db)):
-    return await paymentController.get_all_installments(status, db)
+async def get_payments(filters: Annotated[ListQuery, Query()]):
+    return list_response(await paymentController.get_all_installments(filters))
 
 @router.get("/pending", dependencies=[Depends(require_role(["admin"]))])
 async def get_pending(db: asyncpg.Connection = Depends(get_db)):
@@ -26,49 +30,65 @@ async def get_plan(enrollment_id: int, db: asyncpg.Connection = Depends(get_db))
 async def get_installments(payment_plan_id: int, db: asyncpg.Connection = Depends(get_db)):
     return await paymentController.get_installments(payment_plan_id, db)
 
+async def _upload_voucher_once(installment_id: int, file: UploadFile, student_id, idempotency_key):
+    """upload_voucher behind an optional Idempotency-Key; claims use short-lived connections"""
+    scope = f"user:{student_id}:vouchers"
+    request_fingerprint = idempotency.fingerprint(installment_id, file.filename, file.size)
+    async with db_connection() as db:
+        replay = await idempotency.begin(db, scope, idempotency_key, request_fingerprint)
+    if replay:
+        return replay
+    
+    try:
+        result = await paymentController.upload_voucher(installment_id, file, student_id)
+        if "error" in result:
+            raise HTTPException(status_code=404, detail=result["error"])
+        async with db_connection() as db:
+            await idempotency.complete(db, scope, idempotency_key, status.HTTP_200_OK, result)
+    except BaseException:
+        await idempotency.release(scope, idempotency_key)
+        raise
+    return result
+
 @router.post("/upload-voucher/{installment_id}")
 async def upload_voucher(
     installment_id: int,
     file: UploadFile = File(..., alias="voucher"),
-    current_user: dict = Depends(get_current_user),
-    db: asyncpg.Connection = Depends(get_db)
+    idempotency_key: str = Header(None, alias="Idempotency-Key"),
+    current_user: dict = Depends(get_current_user)
 ):
     student_id = current_user.get("id")
-    result = await paymentController.upload_voucher(installment_id, file, student_id, db)
-    if "error" in result:
-        raise HTTPException(status_code=404, detail=result["error"])
-    return result
+    return await _upload_voucher_once(installment_id, file, student_id, idempotency_key)
 
 @router.post("/upload")
 async def upload_voucher_alt(
     file: UploadFile = File(..., alias="voucher"),
     installment_id: int = Form(None),
-    current_user: dict = Depends(get_current_user),
-    db: asyncpg.Connection = Depends(get_db)
+    idempotency_key: str = Header(None, alias="Idempotency-Key"),
+    current_user: dict = Depends(get_current_user)
 ):
     """Alternative upload endpoint for compatibility (like Node.js) - accepts Form data"""
     if not installment_id:
         raise HTTPException(status_code=400, detail="installment_id es requerido")
     student_id = current_user.get("id")
-    result = await paymentController.upload_voucher(installment_id, file, student_id, db)
-    if "error" in result:
-        raise HTTPException(status_code=404, detail=result["error"])
-    return result
+    return await _upload_voucher_once(installment_id, file, student_id, idempotency_key)
 
 # Approve installment (like Node.js)
 @router.post("/approve", dependencies=[Depends(require_role(["admin"]))])
-async def approve_post(data: dict, db: asyncpg.Connection = Depends(get_db)):
+async def approve_post(data: dict, db: asyncpg.Connection = Depends(get_db_tx)):
     installment_id = data.get("installment_id")
     if not installment_id:
         raise HTTPException(status_code=400, detail="installment_id es requerido")
     result = await paymentController.approve_installment(installment_id, db)
     if "error" in result:
-        raise HTTPException(status_code=404, detail=result["error"])
+        # Full offering or duplicate active enrollment: the installment exists
+        status_code = 409 if result.get("conflict") else 404
+        raise HTTPException(status_code=status_code, detail=result["error"])
     return result
 
 # Reject installment (like Node.js)
 @router.post("/reject", dependencies=[Depends(require_role(["admin"]))])
-async def reject_post(data: dict, db: asyncpg.Connection = Depends(get_db)):
+async def reject_post(data: dict, db: asyncpg.Connection = Depends(get_db_tx)):
     print(f"DEBUG reject_post received data: {data}")  # Debug log
     installment_id = data.get("installment_id")
     reason = data.get("reason")
@@ -1,5 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Annotated
 from models.student import StudentCreate, StudentUpdate
+from models.pagination import ListQuery
+from utils.pagination import list_response
+from utils.search import SEARCH_MIN_LENGTH, SEARCH_MAX_RESULTS
 from middleware.auth import require_role
 from config.database import get_db
 import asyncpg
@@ -9,14 +13,14 @@ router = APIRouter(prefix="/students", tags=["students"])
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
 async def register_student(student: StudentCreate, db: asyncpg.Connection = Depends(get_db)):
-    from utils.security import create_access_token
+    from utils.security import create_principal_token
     
     result = await studentController.create_student(student, db)
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
         
-    token = create_access_token({"id": result['id'], "role": "student"})
+    token = create_principal_token(result['id'], "student", student.dni)
     
     return {
         "token": token,
@@ -29,8 +33,17 @@ async def register_student(student: StudentCreate, db: asyncpg.Connection = Depe
     }
 
 @router.get("", dependencies=[Depends(require_role(["admin"]))])
-async def get_students(db: asyncpg.Connection = Depends(get_db)):
-    return await studentController.get_all_students(db)
+async def get_students(filters: Annotated[ListQuery, Query()], db: asyncpg.Connection = Depends(get_db)):
+    return list_response(await studentController.get_all_students(filters, db))
+
+# Declared before /{student_id} so "search" is not parsed as an id
+@router.get("/search", dependencies=[Depends(require_role(["admin"]))])
+async def search_students(
+    q: str = Query(..., min_length=SEARCH_MIN_LENGTH, max_length=100),
+    limit: int = Query(10, ge=1, le=SEARCH_MAX_RESULTS),
+    db: asyncpg.Connection = Depends(get_db)
+):
+    return await studentController.search_students(q, limit, db)
 
 @router.get("/{student_id}", dependencies=[Depends(require_role(["admin"]))])
 async def get_student(student_id: int, db: asyncpg.Connection = Depends(get_db)):
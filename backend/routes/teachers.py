@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from models.teacher import TeacherCreate, TeacherUpdate, AttendanceCreate
 from middleware.auth import require_role, get_current_user
-from config.database import get_db
+from config.database import get_db, get_db_tx
 import asyncpg
 import controllers.teacherController as teacherController
+from utils.search import SEARCH_MIN_LENGTH, SEARCH_MAX_RESULTS
 
 router = APIRouter(prefix="/teachers", tags=["teachers"])
 
@@ -11,6 +12,15 @@ router = APIRouter(prefix="/teachers", tags=["teachers"])
 async def get_teachers(db: asyncpg.Connection = Depends(get_db)):
     return await teacherController.get_all_teachers(db)
 
+# Declared before /{teacher_id} so "search" is not parsed as an id
+@router.get("/search", dependencies=[Depends(require_role(["admin"]))])
+async def search_teachers(
+    q: str = Query(..., min_length=SEARCH_MIN_LENGTH, max_length=100),
+    limit: int = Query(10, ge=1, le=SEARCH_MAX_RESULTS),
+    db: asyncpg.Connection = Depends(get_db)
+):
+    return await teacherController.search_teachers(q, limit, db)
+
 @router.get("/{teacher_id}", dependencies=[Depends(require_role(["admin"]))])
 async def get_teacher(teacher_id: int, db: asyncpg.Connection = Depends(get_db)):
     teacher = await teacherController.get_teacher_by_id(teacher_id, db)
@@ -19,7 +29,7 @@ async def get_teacher(teacher_id: int, db: asyncpg.Connection = Depends(get_db))
     return teacher
 
 @router.post("", dependencies=[Depends(require_role(["admin"]))], status_code=status.HTTP_201_CREATED)
-async def create_teacher(teacher: TeacherCreate, db: asyncpg.Connection = Depends(get_db)):
+async def create_teacher(teacher: TeacherCreate, db: asyncpg.Connection = Depends(get_db_tx)):
     return await teacherController.create_teacher(teacher, db)
 
 @router.put("/{teacher_id}", dependencies=[Depends(require_role(["admin"]))])
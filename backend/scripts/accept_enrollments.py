@@ -5,7 +5,14 @@ import asyncio
 import asyncpg
 from dotenv import load_dotenv
 import os
+import sys
 from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from controllers.enrollmentController import cascade_package_courses
 
 load_dotenv()
 
@@ -26,28 +33,34 @@ async def main():
         
         print(f"\n📋 Encontradas {len(enrollments)} matrículas pendientes")
         
-        accepted = 0
-        for enrollment in enrollments:
-            # Aceptar matrícula
+        enrollment_ids = [enrollment['id'] for enrollment in enrollments]
+        now = datetime.now()
+        
+        async with conn.transaction():
+            # Aceptar matrículas
             await conn.execute("""
                 UPDATE enrollments
                 SET status = 'aceptado', accepted_at = $1
-                WHERE id = $2
-            """, datetime.now(), enrollment['id'])
+                WHERE id = ANY($2::int[])
+            """, now, enrollment_ids)
             
-            # Aprobar pago (marcar cuota como pagada)
+            # Aprobar pagos (marcar cuotas como pagadas)
             await conn.execute("""
                 UPDATE installments i
                 SET status = 'paid', paid_at = $1
                 FROM payment_plans pp
                 WHERE i.payment_plan_id = pp.id
-                AND pp.enrollment_id = $2
-            """, datetime.now(), enrollment['id'])
+                AND pp.enrollment_id = ANY($2::int[])
+            """, now, enrollment_ids)
             
-            accepted += 1
+            # Matricular en los cursos de los paquetes aceptados (mismo paso que /enrollments/status)
+            courses_enrolled = await cascade_package_courses(enrollment_ids, conn)
+        
+        for enrollment in enrollments:
             print(f"  ✓ {enrollment['first_name']} {enrollment['last_name']} - {enrollment['enrollment_type']}")
         
-        print(f"\n✅ {accepted} matrículas aceptadas y pagos aprobados!")
+        print(f"\n✅ {len(enrollments)} matrículas aceptadas y pagos aprobados!")
+        print(f"📦 {courses_enrolled} cursos de paquete matriculados automáticamente")
         
     except Exception as e:
         print(f"\n❌ Error: {e}")
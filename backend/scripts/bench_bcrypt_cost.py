@@ -0,0 +1,54 @@
+"""
+Elige el costo de bcrypt (BCRYPT_ROUNDS) para este hardware
+
+Mide cuánto tarda una verificación con cada costo y recomienda el más alto
+cuya mediana quede por debajo de la latencia objetivo. Correrlo en la misma
+máquina (o tipo de instancia) donde corre la API.
+
+Uso:
+    python scripts/bench_bcrypt_cost.py --target-ms 250
+"""
+import argparse
+import statistics
+import time
+
+from passlib.hash import bcrypt
+
+def measure(rounds: int, samples: int) -> float:
+    hashed = bcrypt.using(rounds=rounds).hash("benchmark-password")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.verify("benchmark-password", hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250, help="latencia objetivo por verificación")
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=15)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    chosen = None
+    print(f"🎯 Objetivo: {args.target_ms:.0f} ms por verificación\n")
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        median_ms = measure(rounds, args.samples)
+        mark = "✓" if median_ms <= args.target_ms else "✗"
+        print(f"  {mark} rounds={rounds:2d}  mediana={median_ms:8.1f} ms")
+        if median_ms <= args.target_ms:
+            chosen = rounds
+        else:
+            # Cada ronda duplica el costo, no tiene sentido seguir
+            break
+
+    if chosen is None:
+        print(f"\n⚠️  Ni rounds={args.min_rounds} cumple el objetivo; usa ese mínimo o sube el objetivo")
+        chosen = args.min_rounds
+
+    print(f"\n✅ Recomendado: BCRYPT_ROUNDS={chosen}")
+    print("   Los hashes existentes se actualizan solos en el siguiente login.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark de commits por request: autocommit vs get_db_tx
+
+Ejecuta create_enrollment y update_enrollment_status (los flujos que ahora usan
+get_db_tx) con un estudiante temporal, primero en autocommit como antes y luego
+dentro de una sola transacción. Para cada modo reporta commits del servidor
+(pg_stat_database.xact_commit), bytes de WAL generados y latencia.
+
+Los contadores son de toda la base: correrlo sin otro tráfico (staging/local).
+
+Uso:
+    python scripts/bench_commits.py --iterations 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import controllers.enrollmentController as enrollmentController
+from models.enrollment import EnrollmentCreate, EnrollmentItem, EnrollmentStatusUpdate
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+BENCH_DNI = "69999999"
+
+async def server_counters(conn):
+    # PG15+ can flush this backend's pending stats on demand; older versions need a pause
+    try:
+        await conn.execute("SELECT pg_stat_force_next_flush()")
+    except asyncpg.UndefinedFunctionError:
+        await asyncio.sleep(1.1)
+    await conn.execute("SELECT pg_stat_clear_snapshot()")
+    return await conn.fetchrow(
+        """SELECT xact_commit, pg_current_wal_lsn() AS lsn
+           FROM pg_stat_database WHERE datname = current_database()"""
+    )
+
+async def one_request(conn, student_id, offering_id, use_tx):
+    async def flow():
+        result = await enrollmentController.create_enrollment(
+            student_id,
+            EnrollmentCreate(items=[EnrollmentItem(type="course", id=offering_id)]),
+            conn
+        )
+        enrollment_id = result["created"][0]["enrollmentId"]
+        await enrollmentController.update_enrollment_status(
+            EnrollmentStatusUpdate(enrollment_id=enrollment_id, status="rechazado"),
+            conn
+        )
+
+    if use_tx:
+        async with conn.transaction():
+            await flow()
+    else:
+        await flow()
+
+async def counter_overhead(conn):
+    """Commits the counter reads themselves add between two snapshots"""
+    first = await server_counters(conn)
+    second = await server_counters(conn)
+    return second['xact_commit'] - first['xact_commit']
+
+async def run_mode(conn, student_id, offering_id, iterations, use_tx):
+    overhead = await counter_overhead(conn)
+    commits = 0
+    wal_bytes = 0
+    timings = []
+    for _ in range(iterations):
+        before = await server_counters(conn)
+        start = time.perf_counter()
+        await one_request(conn, student_id, offering_id, use_tx)
+        timings.append((time.perf_counter() - start) * 1000)
+        after = await server_counters(conn)
+
+        commits += after['xact_commit'] - before['xact_commit'] - overhead
+        wal_bytes += await conn.fetchval("SELECT $1::pg_lsn - $2::pg_lsn", after['lsn'], before['lsn'])
+
+        await conn.execute("DELETE FROM enrollments WHERE student_id = $1", student_id)
+
+    return {
+        "commits_per_request": commits / iterations,
+        "wal_bytes_per_request": float(wal_bytes) / iterations,
+        "p50_ms": statistics.median(timings),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    student_id = None
+    try:
+        offering_id = await conn.fetchval("SELECT id FROM course_offerings ORDER BY id LIMIT 1")
+        if not offering_id:
+            print("❌ No hay ofertas de curso; corre populate_db.py primero")
+            return
+
+        student_id = await conn.fetchval(
+            """INSERT INTO students (dni, first_name, last_name, phone, parent_name, parent_phone, password_hash)
+               VALUES ($1, 'Bench', 'Commits', '900000000', 'Bench', '900000000', 'x')
+               ON CONFLICT (dni) DO UPDATE SET first_name = EXCLUDED.first_name
+               RETURNING id""",
+            BENCH_DNI
+        )
+
+        for label, use_tx in (("autocommit (antes)", False), ("get_db_tx (ahora)", True)):
+            stats = await run_mode(conn, student_id, offering_id, args.iterations, use_tx)
+            print(f"\n{label}")
+            print(f"  commits/request: {stats['commits_per_request']:.1f}")
+            print(f"  WAL/request:     {stats['wal_bytes_per_request']:.0f} bytes")
+            print(f"  p50:             {stats['p50_ms']:.2f} ms")
+    finally:
+        if student_id:
+            await conn.execute("DELETE FROM enrollments WHERE student_id = $1", student_id)
+            await conn.execute("DELETE FROM students WHERE id = $1", student_id)
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
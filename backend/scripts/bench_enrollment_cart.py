@@ -0,0 +1,94 @@
+"""
+Benchmark de create_enrollment según el tamaño del carrito
+
+Para carritos de 1 a --max-items cursos mide la latencia (p50) y la cantidad de
+sentencias que ejecuta create_enrollment. Cada intento corre dentro de una
+transacción que se revierte, así que no deja matrículas. Usa un estudiante
+temporal que se borra al final.
+
+Uso:
+    python scripts/bench_enrollment_cart.py --max-items 8 --iterations 30
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import controllers.enrollmentController as enrollmentController
+from models.enrollment import EnrollmentCreate, EnrollmentItem
+from utils.query_stats import InstrumentedConnection, start_request
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+BENCH_DNI = "69999998"
+
+async def one_cart(conn, student_id, offering_ids):
+    cart = EnrollmentCreate(items=[EnrollmentItem(type="course", id=oid) for oid in offering_ids])
+    stats = start_request("bench_enrollment_cart")
+    tx = conn.transaction()
+    await tx.start()
+    try:
+        start = time.perf_counter()
+        result = await enrollmentController.create_enrollment(student_id, cart, InstrumentedConnection(conn))
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        await tx.rollback()
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return elapsed, stats.count
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-items", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    student_id = None
+    try:
+        offering_ids = [
+            row["id"] for row in await conn.fetch(
+                "SELECT id FROM course_offerings ORDER BY id LIMIT $1", args.max_items
+            )
+        ]
+        if not offering_ids:
+            print("❌ No hay ofertas de curso; corre populate_db.py primero")
+            return
+
+        student_id = await conn.fetchval(
+            """INSERT INTO students (dni, first_name, last_name, phone, parent_name, parent_phone, password_hash)
+               VALUES ($1, 'Bench', 'Carrito', '900000000', 'Bench', '900000000', 'x')
+               ON CONFLICT (dni) DO UPDATE SET first_name = EXCLUDED.first_name
+               RETURNING id""",
+            BENCH_DNI
+        )
+
+        print(f"{'items':>5}  {'consultas':>9}  {'p50 ms':>8}  {'p99 ms':>8}")
+        for size in range(1, len(offering_ids) + 1):
+            timings = []
+            queries = 0
+            for _ in range(args.iterations):
+                elapsed, queries = await one_cart(conn, student_id, offering_ids[:size])
+                timings.append(elapsed)
+            timings.sort()
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            print(f"{size:>5}  {queries:>9}  {statistics.median(timings):>8.2f}  {p99:>8.2f}")
+    finally:
+        if student_id:
+            await conn.execute("DELETE FROM enrollments WHERE student_id = $1", student_id)
+            await conn.execute("DELETE FROM students WHERE id = $1", student_id)
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
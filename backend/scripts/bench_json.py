@@ -0,0 +1,110 @@
+"""
+Micro-benchmark de serialización JSON para listas grandes
+
+Compara el camino por defecto de FastAPI (dict(r) por fila + jsonable_encoder +
+json.dumps) con RecordJSONResponse (orjson directo) sobre filas con los tipos
+que devuelve Postgres: Decimal, date, datetime, time y NULLs. Además comprueba
+que ambos caminos produzcan el mismo JSON.
+
+Por defecto usa 10k filas sintéticas. Con --db serializa filas reales de
+GET /payments (asyncpg Records).
+
+Uso:
+    python scripts/bench_json.py --rows 10000
+    python scripts/bench_json.py --db
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import orjson
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.json_response import RecordJSONResponse
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+def synthetic_rows(count: int):
+    base = datetime(2025, 3, 1, 8, 30)
+    return [
+        {
+            "id": i,
+            "payment_plan_id": i // 3,
+            "installment_number": i % 3 + 1,
+            "amount": Decimal("150.00") if i % 2 else Decimal("200"),
+            "due_date": date(2025, 3, 1) + timedelta(days=i % 90),
+            "status": "pending" if i % 4 else "paid",
+            "paid_at": base + timedelta(hours=i) if i % 4 == 0 else None,
+            "voucher_url": None,
+            "start_time": dtime(8, 0),
+            "first_name": "Estudiante",
+            "last_name": f"Número {i}",
+            "dni": f"{70000000 + i}",
+            "item_name": "Paquete Ciencias",
+        }
+        for i in range(count)
+    ]
+
+async def db_rows():
+    import asyncpg
+    import controllers.paymentController as paymentController
+    from models.pagination import ListQuery
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        sql, params = paymentController.installments_query(ListQuery())
+        return await conn.fetch(sql, *params)
+    finally:
+        await conn.close()
+
+def default_path(rows):
+    # What FastAPI does for a plain return value
+    return JSONResponse(jsonable_encoder([dict(r) for r in rows])).body
+
+def fast_path(rows):
+    return RecordJSONResponse(rows).body
+
+def timed(fn, rows, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(rows)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--db", action="store_true", help="usar filas reales de installments")
+    args = parser.parse_args()
+
+    rows = asyncio.run(db_rows()) if args.db else synthetic_rows(args.rows)
+    print(f"📦 {len(rows)} filas\n")
+
+    if json.loads(default_path(rows)) != orjson.loads(fast_path(rows)):
+        print("❌ Los dos caminos producen JSON distinto")
+        sys.exit(1)
+
+    before = timed(default_path, rows, args.iterations)
+    after = timed(fast_path, rows, args.iterations)
+    print(f"  jsonable_encoder + json: {before:8.2f} ms")
+    print(f"  RecordJSONResponse:      {after:8.2f} ms")
+    print(f"\n✅ {before / after:.1f}x más rápido, mismo JSON")
+
+if __name__ == "__main__":
+    main()
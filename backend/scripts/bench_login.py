@@ -0,0 +1,131 @@
+"""
+Benchmark de la resolución de credenciales en el login
+
+Compara la búsqueda anterior (users -> students -> teachers, hasta 3 round trips)
+con la consulta unificada de authController.LOGIN_LOOKUP_SQL. Mide solo la parte
+de base de datos: la verificación bcrypt es idéntica en ambos caminos.
+
+Uso:
+    python scripts/bench_login.py --seed        # crea 50k estudiantes de prueba
+    python scripts/bench_login.py               # corre el benchmark
+    python scripts/bench_login.py --cleanup     # borra los estudiantes de prueba
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from controllers.authController import LOGIN_LOOKUP_SQL
+from utils.security import get_password_hash
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Los DNIs de prueba van en un rango propio para poder borrarlos después
+BENCH_DNI_START = 60000000
+
+async def legacy_lookup(conn, dni):
+    user = await conn.fetchrow(
+        "SELECT id, username, role, password_hash, related_id FROM users WHERE username = $1",
+        dni
+    )
+    if user:
+        if user['role'] == 'teacher' and user['related_id']:
+            await conn.fetchrow(
+                "SELECT first_name, last_name, email FROM teachers WHERE id = $1",
+                user['related_id']
+            )
+        return user
+    return await conn.fetchrow(
+        "SELECT id, dni, first_name, last_name, password_hash FROM students WHERE dni = $1",
+        dni
+    )
+
+async def unified_lookup(conn, dni):
+    return await conn.fetchrow(LOGIN_LOOKUP_SQL, dni)
+
+async def seed(conn, count):
+    password_hash = get_password_hash("123456")
+    await conn.execute(
+        """INSERT INTO students (dni, first_name, last_name, phone, parent_name, parent_phone, password_hash)
+           SELECT (g)::text, 'Bench', 'Alumno ' || g, '900000000', 'Bench Padre', '900000000', $3
+           FROM generate_series($1::int, $2::int) g
+           ON CONFLICT (dni) DO NOTHING""",
+        BENCH_DNI_START, BENCH_DNI_START + count - 1, password_hash
+    )
+    await conn.execute("ANALYZE students")
+    print(f"✅ {count} estudiantes de prueba listos (DNI {BENCH_DNI_START}...)")
+
+async def cleanup(conn, count):
+    result = await conn.execute(
+        "DELETE FROM students WHERE dni BETWEEN $1 AND $2 AND first_name = 'Bench'",
+        str(BENCH_DNI_START), str(BENCH_DNI_START + count - 1)
+    )
+    print(f"🧹 {result}")
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run(conn, count, iterations):
+    teacher_dnis = [r['username'] for r in await conn.fetch(
+        "SELECT username FROM users WHERE role = 'teacher' LIMIT 50"
+    )]
+
+    # ~90% estudiantes, ~10% docentes, como un día de matrícula
+    dnis = []
+    for _ in range(iterations):
+        if teacher_dnis and random.random() < 0.1:
+            dnis.append(random.choice(teacher_dnis))
+        else:
+            dnis.append(str(BENCH_DNI_START + random.randrange(count)))
+
+    for name, lookup in (("anterior (3 consultas)", legacy_lookup), ("unificada (1 consulta)", unified_lookup)):
+        # Warm up plan caches
+        for dni in dnis[:50]:
+            await lookup(conn, dni)
+
+        samples = []
+        for dni in dnis:
+            start = time.perf_counter()
+            await lookup(conn, dni)
+            samples.append((time.perf_counter() - start) * 1000)
+
+        print(f"\n{name}")
+        print(f"  p50: {percentile(samples, 50):.3f} ms")
+        print(f"  p99: {percentile(samples, 99):.3f} ms")
+        print(f"  media: {statistics.mean(samples):.3f} ms")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="crear estudiantes de prueba")
+    parser.add_argument("--cleanup", action="store_true", help="borrar estudiantes de prueba")
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        if args.seed:
+            await seed(conn, args.students)
+        elif args.cleanup:
+            await cleanup(conn, args.students)
+        else:
+            await run(conn, args.students, args.iterations)
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
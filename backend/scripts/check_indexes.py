@@ -0,0 +1,124 @@
+"""
+Verifica con EXPLAIN que las consultas calientes usan los índices de las migraciones
+
+Para cada índice de las migraciones 003 a 005 corre EXPLAIN sobre una consulta
+con el mismo predicado que usan los controllers y comprueba que el plan
+lo use. Se desactiva el seq scan dentro de la transacción para que el resultado
+no dependa del tamaño de las tablas (en una base chica el planner prefiere leer
+la tabla entera aunque el índice exista).
+
+Termina con código 1 si algún índice falta o no se usa.
+
+Uso:
+    python scripts/check_indexes.py
+"""
+import asyncio
+import json
+import os
+import sys
+
+import asyncpg
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+CHECKS = [
+    (
+        "idx_enrollments_student_status",
+        "SELECT id FROM enrollments WHERE student_id = 1 AND status = 'aceptado'",
+    ),
+    (
+        "idx_enrollments_package_offering",
+        "SELECT id FROM enrollments WHERE package_offering_id = 1",
+    ),
+    (
+        "idx_installments_plan_status",
+        "SELECT COUNT(*) FROM installments WHERE payment_plan_id = 1 AND status != 'paid'",
+    ),
+    (
+        "idx_attendance_schedule_date",
+        "SELECT id FROM attendance WHERE schedule_id = 1 AND date = CURRENT_DATE",
+    ),
+    (
+        "idx_installments_paid_at",
+        "SELECT id FROM installments WHERE paid_at >= NOW() - INTERVAL '7 days'",
+    ),
+    # Keyset pagination (004)
+    (
+        "idx_enrollments_registered_keyset",
+        """SELECT id FROM enrollments WHERE (registered_at, id) < (NOW(), 1000)
+           ORDER BY registered_at DESC, id DESC LIMIT 51""",
+    ),
+    (
+        "idx_installments_status_id",
+        "SELECT id FROM installments WHERE status = 'pending' AND id < 1000 ORDER BY id DESC LIMIT 51",
+    ),
+    (
+        "idx_students_name_keyset",
+        """SELECT id FROM students WHERE (last_name, first_name, id) > ('A', 'A', 0)
+           ORDER BY last_name, first_name, id LIMIT 51""",
+    ),
+    (
+        "idx_notifications_log_sent_keyset",
+        """SELECT id FROM notifications_log WHERE (sent_at, id) < (NOW(), 1000)
+           ORDER BY sent_at DESC, id DESC LIMIT 51""",
+    ),
+    # Typeahead search (005)
+    ("idx_students_dni_prefix", "SELECT id FROM students WHERE dni LIKE '7012%'"),
+    (
+        "idx_students_full_name_trgm",
+        "SELECT id FROM students WHERE (first_name || ' ' || last_name) ILIKE '%garcia%'",
+    ),
+    ("idx_teachers_dni_prefix", "SELECT id FROM teachers WHERE dni LIKE '4012%'"),
+    (
+        "idx_teachers_full_name_trgm",
+        "SELECT id FROM teachers WHERE (first_name || ' ' || last_name) % 'garcia'",
+    ),
+]
+
+def plan_indexes(node):
+    """Nombres de índices usados en cualquier nodo del plan"""
+    found = set()
+    if "Index Name" in node:
+        found.add(node["Index Name"])
+    for child in node.get("Plans", []):
+        found |= plan_indexes(child)
+    return found
+
+async def main():
+    conn = await asyncpg.connect(DATABASE_URL)
+    failures = 0
+    try:
+        for index_name, query in CHECKS:
+            exists = await conn.fetchval(
+                "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass($1)", index_name
+            )
+            if not exists:
+                print(f"❌ {index_name}: no existe o es inválido (corre scripts/migrate.py)")
+                failures += 1
+                continue
+
+            async with conn.transaction():
+                await conn.execute("SET LOCAL enable_seqscan = off")
+                raw = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}")
+            plan = json.loads(raw)[0]["Plan"]
+            used = plan_indexes(plan)
+
+            if index_name in used:
+                print(f"✓ {index_name}")
+            else:
+                print(f"❌ {index_name}: el plan usa {sorted(used) or 'seq scan'}")
+                print(f"   {query}")
+                failures += 1
+    finally:
+        await conn.close()
+
+    if failures:
+        print(f"\n❌ {failures} índice(s) no verificados")
+        sys.exit(1)
+    print("\n✅ Todas las consultas usan su índice")
+
+if __name__ == "__main__":
+    asyncio.run(main())
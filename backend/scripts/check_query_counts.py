@@ -0,0 +1,87 @@
+"""
+Regresión de cantidad de consultas (N+1) en los flujos del dashboard del estudiante
+
+Ejecuta get_student_enrollments sobre una conexión instrumentada (la misma que
+usa la API, utils/query_stats.py) para los estudiantes con más matrículas y
+verifica que la cantidad de sentencias no dependa del número de matrículas.
+
+Termina con código 1 si algún caso supera el máximo.
+
+Uso:
+    python scripts/check_query_counts.py
+    python scripts/check_query_counts.py --student-id 42
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import controllers.enrollmentController as enrollmentController
+from utils.query_stats import InstrumentedConnection, start_request
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Máximo de sentencias por llamada, sin importar cuántas matrículas tenga el estudiante
+MAX_QUERIES = {
+    "get_student_enrollments": 2,
+}
+
+async def count_queries(conn, name, call):
+    stats = start_request(name)
+    result = await call(InstrumentedConnection(conn))
+    return stats.count, result
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--student-id", type=int, help="revisar solo este estudiante")
+    parser.add_argument("--students", type=int, default=5, help="cuántos estudiantes (los de más matrículas)")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    failures = 0
+    try:
+        if args.student_id:
+            student_ids = [args.student_id]
+        else:
+            student_ids = [
+                row["student_id"] for row in await conn.fetch(
+                    """SELECT student_id FROM enrollments
+                       GROUP BY student_id ORDER BY COUNT(*) DESC LIMIT $1""",
+                    args.students
+                )
+            ]
+        if not student_ids:
+            print("❌ No hay matrículas; corre populate_db.py o enroll_students.py primero")
+            sys.exit(1)
+
+        limit = MAX_QUERIES["get_student_enrollments"]
+        for student_id in student_ids:
+            queries, enrollments = await count_queries(
+                conn, "get_student_enrollments",
+                lambda db: enrollmentController.get_student_enrollments(student_id, db)
+            )
+            installments = sum(len(e["installments"]) for e in enrollments)
+            mark = "✓" if queries <= limit else "❌"
+            print(f"  {mark} estudiante {student_id}: {len(enrollments)} matrículas, "
+                  f"{installments} cuotas -> {queries} consulta(s)")
+            if queries > limit:
+                failures += 1
+    finally:
+        await conn.close()
+
+    if failures:
+        print(f"\n❌ {failures} caso(s) superan {limit} consultas")
+        sys.exit(1)
+    print(f"\n✅ get_student_enrollments se mantiene en ≤ {limit} consultas")
+
+if __name__ == "__main__":
+    asyncio.run(main())
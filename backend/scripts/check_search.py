@@ -0,0 +1,58 @@
+"""
+Prueba rápida de los endpoints de búsqueda (typeahead) de estudiantes y docentes
+
+Llama a GET /api/students/search y GET /api/teachers/search a través de la
+aplicación (rutas, controladores y SQL reales) como administrador, con una
+búsqueda por DNI y otra por nombre, y verifica que respondan 200 con una lista.
+
+Termina con código 1 si alguna falla.
+
+Uso:
+    python scripts/check_search.py
+    python scripts/check_search.py --name Perez --dni 70
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Solo se necesita la API: sin migraciones ni tareas programadas al iniciar
+os.environ.setdefault("DB_AUTO_MIGRATE", "false")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+
+from main import app
+from middleware.auth import get_current_user
+
+ENDPOINTS = ["/api/students/search", "/api/teachers/search"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--name", default="an", help="texto de búsqueda por nombre")
+    parser.add_argument("--dni", default="70", help="prefijo de DNI")
+    args = parser.parse_args()
+
+    app.dependency_overrides[get_current_user] = lambda: {"id": 0, "role": "admin"}
+    failures = 0
+    # Errores del servidor como respuestas 500, para reportarlos junto al resto
+    with TestClient(app, raise_server_exceptions=False) as client:
+        for endpoint in ENDPOINTS:
+            for q in (args.dni, args.name):
+                response = client.get(endpoint, params={"q": q, "limit": 5})
+                ok = response.status_code == 200 and isinstance(response.json(), list)
+                detail = f"{len(response.json())} resultado(s)" if ok else response.text[:200]
+                print(f"  {'✓' if ok else '❌'} {endpoint}?q={q} -> {response.status_code}, {detail}")
+                if not ok:
+                    failures += 1
+
+    if failures:
+        print(f"\n❌ {failures} búsqueda(s) fallaron")
+        sys.exit(1)
+    print("\n✅ Búsquedas OK")
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,146 @@
+"""
+Cancela matrículas activas duplicadas, en línea y por lotes
+
+Una matrícula activa (no 'cancelado') es duplicada si el estudiante ya tiene
+otra activa en la misma oferta: mismo curso directo, mismo paquete, o mismo
+curso de un mismo paquete. Desde la migración 008 los índices únicos parciales
+lo impiden; este script repara los datos previos (conviene correrlo antes de
+aplicar la migración 008, que se detiene si aún quedan duplicadas).
+
+De cada grupo se conserva la mejor ('aceptado' sobre 'pendiente' sobre el
+resto, luego la más reciente) y las demás pasan a 'cancelado': no se elimina
+nada, así que sus planes de pago y cuotas pagadas quedan en el historial.
+
+Recorre los estudiantes por id en lotes pequeños, cada uno en su propia
+transacción corta con lock_timeout, así que no bloquea la tabla y puede
+correr con tráfico. El avance se guarda en maintenance_checkpoints: si se
+interrumpe, al volver a correrlo continúa donde quedó.
+
+Uso:
+    python scripts/cleanup_duplicates.py --dry-run
+    python scripts/cleanup_duplicates.py --batch-size 500 --pause 0.2
+    python scripts/cleanup_duplicates.py --restart   # empieza desde el primer estudiante
+"""
+import argparse
 import asyncio
-import asyncpg
 import os
+
+import asyncpg
 from dotenv import load_dotenv
 
 load_dotenv()
 
-async def cleanup_duplicate_enrollments():
-    """
-    Remove duplicate enrollments keeping:
-    1. 'aceptado' status over others
-    2. Most recent enrollment if same status
-    """
+JOB_NAME = "cleanup_duplicates"
+
+# Created here: the script runs before migration 008, on schemas without it
+CHECKPOINT_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS maintenance_checkpoints (
+        job TEXT PRIMARY KEY,
+        last_id BIGINT NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+# Extra rows of each active duplicate group among one batch of students
+DUPLICATES_SQL = """
+    SELECT id, student_id, enrollment_type, course_offering_id, package_offering_id, status
+    FROM (
+        SELECT e.*, ROW_NUMBER() OVER (
+                   PARTITION BY student_id, enrollment_type, course_offering_id, package_offering_id
+                   ORDER BY CASE status WHEN 'aceptado' THEN 1 WHEN 'pendiente' THEN 2 ELSE 3 END,
+                            registered_at DESC, id DESC
+               ) AS rank
+        FROM enrollments e
+        WHERE student_id = ANY($1::int[]) AND status <> 'cancelado'
+    ) ranked
+    WHERE rank > 1
+    ORDER BY id
+"""
+
+async def load_checkpoint(conn, restart: bool) -> int:
+    if restart:
+        await conn.execute("DELETE FROM maintenance_checkpoints WHERE job = $1", JOB_NAME)
+        return 0
+    last_id = await conn.fetchval("SELECT last_id FROM maintenance_checkpoints WHERE job = $1", JOB_NAME)
+    return last_id or 0
+
+async def save_checkpoint(conn, last_id: int):
+    await conn.execute(
+        """INSERT INTO maintenance_checkpoints (job, last_id) VALUES ($1, $2)
+           ON CONFLICT (job) DO UPDATE SET last_id = EXCLUDED.last_id, updated_at = now()""",
+        JOB_NAME, last_id
+    )
+
+async def process_batch(conn, student_ids, dry_run: bool) -> int:
+    """One short transaction: find the batch's duplicates, cancel them, move the checkpoint"""
+    async with conn.transaction():
+        await conn.execute("SET LOCAL lock_timeout = '2s'")
+        duplicates = await conn.fetch(DUPLICATES_SQL, student_ids)
+        for dup in duplicates:
+            offering = dup['course_offering_id'] or dup['package_offering_id']
+            print(f"  Estudiante {dup['student_id']}, {dup['enrollment_type']} {offering}: "
+                  f"matrícula {dup['id']} ({dup['status']})")
+        if duplicates and not dry_run:
+            # The seat trigger (migration 006) releases their seats
+            await conn.execute(
+                "UPDATE enrollments SET status = 'cancelado' WHERE id = ANY($1::int[])",
+                [dup['id'] for dup in duplicates]
+            )
+        if not dry_run:
+            await save_checkpoint(conn, student_ids[-1])
+    return len(duplicates)
+
+async def cleanup_duplicate_enrollments(batch_size: int, pause: float, dry_run: bool, restart: bool):
     conn = await asyncpg.connect(os.getenv('DATABASE_URL'))
-    
+
     try:
-        # Find duplicates for course enrollments
-        course_duplicates = await conn.fetch("""
-            SELECT student_id, course_offering_id, 
-                   array_agg(id ORDER BY 
-                       CASE status 
-                           WHEN 'aceptado' THEN 1 
-                           WHEN 'pendiente' THEN 2 
-                           WHEN 'rechazado' THEN 3 
-                           WHEN 'cancelado' THEN 4 
-                       END,
-                       registered_at DESC
-                   ) as enrollment_ids
-            FROM enrollments
-            WHERE course_offering_id IS NOT NULL
-            GROUP BY student_id, course_offering_id
-            HAVING COUNT(*) > 1
-        """)
-        
-        # Find duplicates for package enrollments
-        package_duplicates = await conn.fetch("""
-            SELECT student_id, package_offering_id,
-                   array_agg(id ORDER BY 
-                       CASE status 
-                           WHEN 'aceptado' THEN 1 
-                           WHEN 'pendiente' THEN 2 
-                           WHEN 'rechazado' THEN 3 
-                           WHEN 'cancelado' THEN 4 
-                       END,
-                       registered_at DESC
-                   ) as enrollment_ids
-            FROM enrollments
-            WHERE package_offering_id IS NOT NULL
-            GROUP BY student_id, package_offering_id
-            HAVING COUNT(*) > 1
-        """)
-        
-        total_deleted = 0
-        
-        print("\n" + "="*80)
-        print("CLEANING DUPLICATE ENROLLMENTS")
-        print("="*80)
-        
-        # Process course duplicates
-        for dup in course_duplicates:
-            ids_to_delete = dup['enrollment_ids'][1:]  # Keep first (best), delete rest
-            print(f"\nStudent {dup['student_id']}, Course Offering {dup['course_offering_id']}")
-            print(f"  Keeping enrollment ID: {dup['enrollment_ids'][0]}")
-            print(f"  Deleting IDs: {ids_to_delete}")
-            
-            deleted = await conn.execute(
-                "DELETE FROM enrollments WHERE id = ANY($1)",
-                ids_to_delete
-            )
-            total_deleted += len(ids_to_delete)
-        
-        # Process package duplicates
-        for dup in package_duplicates:
-            ids_to_delete = dup['enrollment_ids'][1:]  # Keep first (best), delete rest
-            print(f"\nStudent {dup['student_id']}, Package Offering {dup['package_offering_id']}")
-            print(f"  Keeping enrollment ID: {dup['enrollment_ids'][0]}")
-            print(f"  Deleting IDs: {ids_to_delete}")
-            
-            deleted = await conn.execute(
-                "DELETE FROM enrollments WHERE id = ANY($1)",
-                ids_to_delete
+        await conn.execute(CHECKPOINT_TABLE_SQL)
+        last_id = await load_checkpoint(conn, restart and not dry_run)
+        if last_id:
+            print(f"↻ Continuando desde el estudiante {last_id}")
+
+        total = 0
+        while True:
+            student_ids = await conn.fetch(
+                "SELECT id FROM students WHERE id > $1 ORDER BY id LIMIT $2",
+                last_id, batch_size
             )
-            total_deleted += len(ids_to_delete)
-        
-        print("\n" + "="*80)
-        print(f"CLEANUP COMPLETE: Deleted {total_deleted} duplicate enrollments")
-        print("="*80 + "\n")
-        
+            if not student_ids:
+                break
+            student_ids = [row['id'] for row in student_ids]
+
+            try:
+                total += await process_batch(conn, student_ids, dry_run)
+            except asyncpg.LockNotAvailableError:
+                # Rows busy with live traffic: back off and retry the same batch
+                print(f"⏳ Lote {student_ids[0]}-{student_ids[-1]} bloqueado, reintentando...")
+                await asyncio.sleep(max(pause, 1.0))
+                continue
+
+            last_id = student_ids[-1]
+            await asyncio.sleep(pause)
+
+        action = "Se cancelarían" if dry_run else "Canceladas"
+        print(f"\n✅ {action} {total} matrículas duplicadas")
+        if not dry_run:
+            await conn.execute("DELETE FROM maintenance_checkpoints WHERE job = $1", JOB_NAME)
+
     except Exception as e:
-        print(f"ERROR: {e}")
+        print(f"❌ Error: {e}")
         raise
     finally:
         await conn.close()
 
 if __name__ == "__main__":
-    print("\n⚠️  WARNING: This will DELETE duplicate enrollments from the database!")
-    print("Press Ctrl+C to cancel, or Enter to continue...")
-    input()
-    asyncio.run(cleanup_duplicate_enrollments())
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="estudiantes por lote")
+    parser.add_argument("--pause", type=float, default=0.1, help="segundos entre lotes")
+    parser.add_argument("--dry-run", action="store_true", help="solo listar, sin cancelar")
+    parser.add_argument("--restart", action="store_true", help="ignorar el avance guardado")
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        print("\n⚠️  Esto CANCELARÁ las matrículas duplicadas de la base de datos!")
+        print("Presiona Ctrl+C para cancelar, o Enter para continuar...")
+        input()
+    asyncio.run(cleanup_duplicate_enrollments(args.batch_size, args.pause, args.dry_run, args.restart))
@@ -1,13 +1,19 @@
 """
 Script para crear 20+ estudiantes de prueba
-Usa bcrypt para hashear contraseñas (mismo método que el sistema)
+Usa la política de hash del sistema (utils.security)
 """
 import asyncio
 import asyncpg
 import random
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 import os
-import bcrypt
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.security import get_password_hash
 
 load_dotenv()
 
@@ -55,7 +61,7 @@ async def main():
             
             # Password hasheado (default: 123456)
             password = "123456"
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            password_hash = get_password_hash(password)
             
             student = await conn.fetchrow(
                 """INSERT INTO students (dni, first_name, last_name, phone, parent_name, parent_phone, password_hash)
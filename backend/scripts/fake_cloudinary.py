@@ -0,0 +1,160 @@
+"""
+Servidor falso de la API de subida de Cloudinary, para probar sin red
+
+Responde POST /v1_1/<cloud>/auto/upload como Cloudinary (secure_url,
+public_id) verificando la firma, con latencia y fallos configurables para
+ejercitar timeouts y reintentos del cliente de config/cloudinary.py.
+
+Uso:
+    # Servidor para la API local (en otra terminal):
+    python scripts/fake_cloudinary.py --port 8765 --delay 0.5 --fail-rate 0.2
+    CLOUDINARY_UPLOAD_URL=http://127.0.0.1:8765/v1_1 uvicorn main:app
+
+    # Prueba de carga: N subidas concurrentes y lag del event loop mientras suben
+    python scripts/fake_cloudinary.py --check --uploads 40 --delay 0.3 --fail-rate 0.2
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+def make_handler(delay: float, fail_rate: float, api_secret: str):
+    import cloudinary.utils
+    from email.parser import BytesParser
+    from email.policy import HTTP
+
+    def parse_form(headers, body: bytes) -> dict:
+        """multipart/form-data body -> {field: bytes}"""
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        return {
+            part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+            for part in message.iter_parts()
+        }
+
+    class FakeUploadHandler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            form = parse_form(self.headers, self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(delay)
+            if random.random() < fail_rate:
+                return self._reply(503, {"error": {"message": "fallo simulado"}})
+
+            params = {key: form[key].decode() for key in ("folder", "public_id", "timestamp")}
+            if form["signature"].decode() != cloudinary.utils.api_sign_request(params, api_secret):
+                return self._reply(401, {"error": {"message": "Invalid Signature"}})
+
+            size = len(form["file"])
+            public_id = f"{params['folder']}/{params['public_id']}"
+            host = self.headers.get("Host")
+            self._reply(200, {
+                "public_id": public_id,
+                "bytes": size,
+                "secure_url": f"http://{host}/image/upload/{public_id}",
+            })
+
+        def log_message(self, *args):
+            pass
+
+    return FakeUploadHandler
+
+def serve(port: int, delay: float, fail_rate: float, api_secret: str):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay, fail_rate, api_secret))
+    # Clients that timed out leave broken pipes behind; that is expected here
+    server.handle_error = lambda request, client_address: None
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01):
+    """Worst delay of a 10 ms sleep: how long something kept the event loop busy"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst * 1000
+
+async def check(uploads: int, size_kb: int):
+    from config.cloudinary import (
+        configure_cloudinary, upload_to_cloudinary, get_upload_stats, close_cloudinary_client
+    )
+    configure_cloudinary()
+    content = os.urandom(size_kb * 1024)
+
+    async def one(n):
+        try:
+            await upload_to_cloudinary(content, f"voucher_check_{n}.jpg", folder="check")
+            return True
+        except Exception as e:
+            print(f"  ❌ {e}")
+            return False
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(n) for n in range(uploads)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lag_ms = await lag_task
+    await close_cloudinary_client()
+
+    stats = get_upload_stats()
+    print(f"\n✅ {sum(results)}/{uploads} subidas en {elapsed:.2f}s")
+    print(f"  reintentos: {stats['retries']}, fallidas: {stats['failures']}")
+    print(f"  subida p50/p95: {stats['upload_ms']['p50']:.0f}/{stats['upload_ms']['p95']:.0f} ms, "
+          f"espera p95: {stats['wait_ms']['p95']:.0f} ms")
+    print(f"  lag máximo del event loop: {lag_ms:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.2, help="segundos por subida")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fracción de respuestas 503")
+    parser.add_argument("--check", action="store_true", help="correr la prueba de carga y salir")
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--size-kb", type=int, default=500)
+    args = parser.parse_args()
+
+    # The client reads the base URL at import time; --check imports it after this
+    os.environ["CLOUDINARY_UPLOAD_URL"] = f"http://127.0.0.1:{args.port}/v1_1"
+    from dotenv import load_dotenv
+    load_dotenv()
+    api_secret = os.getenv("CLOUDINARY_API_SECRET", "ZL1XhzbD6V_IkfIclP-CPNfBSL4")
+
+    print(f"🧪 Cloudinary falso en http://127.0.0.1:{args.port}/v1_1")
+    if not args.check:
+        serve(args.port, args.delay, args.fail_rate, api_secret)
+        return
+
+    # Separate process, so the server's parsing does not show up as event loop lag
+    server = multiprocessing.Process(
+        target=serve, args=(args.port, args.delay, args.fail_rate, api_secret), daemon=True
+    )
+    server.start()
+    try:
+        time.sleep(0.5)
+        asyncio.run(check(args.uploads, args.size_kb))
+    finally:
+        server.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Aplica las migraciones pendientes de backend/migrations
+
+Uso:
+    python scripts/migrate.py           # aplica las pendientes
+    python scripts/migrate.py --status  # solo lista aplicadas y pendientes
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from migrations.runner import applied_migrations, apply_migrations, load_migrations
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+async def status(conn):
+    applied = await applied_migrations(conn)
+    for migration in load_migrations():
+        if migration.version not in applied:
+            mark = "⏳ pendiente"
+        elif applied[migration.version] != migration.checksum:
+            mark = "⚠️  modificada después de aplicarse"
+        else:
+            mark = "✓ aplicada"
+        print(f"  {migration.path.name:45s} {mark}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="no aplicar, solo mostrar el estado")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        if args.status:
+            await status(conn)
+            return
+        applied = await apply_migrations(conn)
+        if applied:
+            print(f"\n✅ {len(applied)} migración(es) aplicada(s)")
+        else:
+            print("✅ No hay migraciones pendientes")
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""
+Prueba de estrés de vacantes: cientos de matrículas concurrentes sin sobreventa
+
+Crea una oferta de curso temporal con --capacity vacantes y --students
+estudiantes temporales que intentan matricularse todos a la vez (cada intento
+en su propia conexión y transacción, como get_db_tx). Verifica que:
+
+  - exactamente --capacity matrículas se crean y el resto recibe el error de vacantes
+  - seats_taken coincide con el COUNT(*) real
+  - cancelar una matrícula libera la vacante y otro estudiante puede tomarla
+
+Todo lo creado se borra al final. Termina con código 1 si algo no cuadra.
+
+Uso:
+    python scripts/stress_seats.py --capacity 25 --students 400
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import controllers.enrollmentController as enrollmentController
+from models.enrollment import EnrollmentCreate, EnrollmentItem
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Rango de DNIs temporales, fuera de los que usan populate_db y los benchmarks
+DNI_BASE = 68000000
+
+async def enroll(pool, student_id, offering_id):
+    cart = EnrollmentCreate(items=[EnrollmentItem(type="course", id=offering_id)])
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            result = await enrollmentController.create_enrollment(student_id, cart, conn)
+            if "error" in result:
+                # Como la ruta: HTTPException -> rollback
+                raise RuntimeError(result["error"])
+    return result
+
+async def active_count(conn, offering_id):
+    return await conn.fetchrow(
+        """SELECT co.seats_taken,
+                  (SELECT COUNT(*) FROM enrollments e
+                   WHERE e.course_offering_id = co.id AND e.package_offering_id IS NULL
+                     AND e.status IN ('pendiente', 'aceptado')) AS real_count
+           FROM course_offerings co WHERE co.id = $1""",
+        offering_id
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacity", type=int, default=25)
+    parser.add_argument("--students", type=int, default=400)
+    parser.add_argument("--connections", type=int, default=40)
+    args = parser.parse_args()
+
+    pool = await asyncpg.create_pool(DATABASE_URL, min_size=args.connections, max_size=args.connections)
+    offering_id = None
+    failures = 0
+    try:
+        async with pool.acquire() as conn:
+            offering_id = await conn.fetchval(
+                """INSERT INTO course_offerings (course_id, cycle_id, group_label, capacity)
+                   SELECT course_id, cycle_id, 'STRESS', $1 FROM course_offerings ORDER BY id LIMIT 1
+                   RETURNING id""",
+                args.capacity
+            )
+            if not offering_id:
+                print("❌ No hay ofertas de curso; corre populate_db.py primero")
+                return
+            student_ids = [
+                row["id"] for row in await conn.fetch(
+                    """INSERT INTO students (dni, first_name, last_name, phone, parent_name, parent_phone, password_hash)
+                       SELECT ($1 + n)::text, 'Stress', 'Vacantes', '900000000', 'Stress', '900000000', 'x'
+                       FROM generate_series(1, $2) AS n
+                       RETURNING id""",
+                    DNI_BASE, args.students
+                )
+            ]
+
+        print(f"🏁 {len(student_ids)} estudiantes compiten por {args.capacity} vacantes...")
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(enroll(pool, sid, offering_id) for sid in student_ids), return_exceptions=True
+        )
+        elapsed = time.perf_counter() - start
+
+        created = [r for r in results if not isinstance(r, Exception)]
+        full = [r for r in results if isinstance(r, RuntimeError) and "vacantes" in str(r)]
+        other = [r for r in results if isinstance(r, Exception) and r not in full]
+        print(f"   {len(created)} creadas, {len(full)} sin vacante, {len(other)} otros errores ({elapsed:.2f} s)")
+        for err in other[:5]:
+            print(f"   ⚠️  {type(err).__name__}: {err}")
+
+        async with pool.acquire() as conn:
+            counts = await active_count(conn, offering_id)
+        print(f"   seats_taken={counts['seats_taken']}  COUNT(*)={counts['real_count']}")
+        if len(created) != args.capacity or counts['seats_taken'] != args.capacity or counts['real_count'] != args.capacity or other:
+            print("❌ Sobreventa o contador inconsistente")
+            failures += 1
+
+        # Cancelar una matrícula libera su vacante
+        if created:
+            enrollment_id = created[0]["created"][0]["enrollmentId"]
+            async with pool.acquire() as conn:
+                owner = await conn.fetchval("SELECT student_id FROM enrollments WHERE id = $1", enrollment_id)
+                await enrollmentController.cancel_enrollment(owner, enrollment_id, conn)
+                waiting = await conn.fetchval(
+                    """SELECT s.id FROM students s WHERE s.dni::bigint > $1 AND s.dni::bigint <= $1 + $2
+                         AND s.first_name = 'Stress'
+                         AND NOT EXISTS (SELECT 1 FROM enrollments e WHERE e.student_id = s.id)
+                       LIMIT 1""",
+                    DNI_BASE, args.students
+                )
+            await enroll(pool, waiting, offering_id)
+            async with pool.acquire() as conn:
+                counts = await active_count(conn, offering_id)
+            if counts['seats_taken'] != args.capacity or counts['real_count'] != args.capacity:
+                print("❌ La vacante liberada no se contabilizó bien")
+                failures += 1
+            else:
+                print("   ✓ cancelar libera la vacante y otro estudiante la toma")
+    finally:
+        async with pool.acquire() as conn:
+            await conn.execute(
+                """DELETE FROM students WHERE first_name = 'Stress' AND last_name = 'Vacantes'"""
+            )
+            if offering_id:
+                await conn.execute("DELETE FROM course_offerings WHERE id = $1", offering_id)
+        await pool.close()
+
+    if failures:
+        sys.exit(1)
+    print("\n✅ Sin sobreventa: las vacantes se respetan bajo concurrencia")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+In-process periodic jobs.
+
+Every uvicorn worker runs a Scheduler (started and stopped by the app's
+startup/shutdown events), but each run of a job happens in one worker only:
+the runner takes a Postgres advisory lock for the job first and skips the
+run when another worker holds it. When a job last started is kept in
+scheduled_jobs, so "due" means the same thing in every worker and across
+restarts.
+
+Jobs are `async def job(db) -> int` returning how many rows they handled;
+they should work in small batches so no run holds locks for long.
+"""
+import asyncio
+import os
+import traceback
+from config.database import db_connection
+from controllers.paymentController import mark_overdue_installments
+from utils.idempotency import purge_expired
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+# How often each worker checks whether a job is due
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "30"))
+OVERDUE_JOB_INTERVAL_SECONDS = int(os.getenv("OVERDUE_JOB_INTERVAL_SECONDS", "600"))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+
+_LOCK_NAMESPACE = 7_340_212  # advisory lock class for jobs; the job name is the second key
+
+class Job:
+    def __init__(self, name: str, interval_seconds: int, func):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+
+class Scheduler:
+    def __init__(self):
+        self.jobs = []
+        self._task = None
+
+    def add_job(self, name: str, interval_seconds: int, func):
+        self.jobs.append(Job(name, interval_seconds, func))
+
+    def start(self):
+        if not SCHEDULER_ENABLED or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop())
+        print(f"✓ Scheduler started ({len(self.jobs)} jobs)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _loop(self):
+        while True:
+            for job in self.jobs:
+                try:
+                    await self.run_if_due(job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Pool exhausted, database restarting...: try again next tick
+                    print(f"⚠️  Scheduler could not run {job.name}: {e}")
+            await asyncio.sleep(SCHEDULER_TICK_SECONDS)
+
+    async def run_if_due(self, job: Job):
+        """Run `job` here if it is due and no other worker is running it.
+
+        Returns the job's result, or None when it was skipped.
+        """
+        async with db_connection() as db:
+            locked = await db.fetchval(
+                "SELECT pg_try_advisory_lock($1, hashtext($2))", _LOCK_NAMESPACE, job.name
+            )
+            if not locked:
+                return None
+            try:
+                # Checked under the lock: another worker may have just finished a run
+                due = await db.fetchval(
+                    """SELECT last_started_at IS NULL
+                              OR last_started_at <= now() - make_interval(secs => $2)
+                       FROM scheduled_jobs WHERE name = $1""",
+                    job.name, job.interval_seconds
+                )
+                if due is False:
+                    return None
+                return await self._run(job, db)
+            finally:
+                await db.execute(
+                    "SELECT pg_advisory_unlock($1, hashtext($2))", _LOCK_NAMESPACE, job.name
+                )
+
+    async def _run(self, job: Job, db):
+        await db.execute(
+            """INSERT INTO scheduled_jobs (name, last_started_at) VALUES ($1, now())
+               ON CONFLICT (name) DO UPDATE SET last_started_at = now()""",
+            job.name
+        )
+        try:
+            result = await job.func(db)
+        except Exception as e:
+            traceback.print_exc()
+            await db.execute(
+                """UPDATE scheduled_jobs
+                   SET last_finished_at = now(), last_status = 'error', last_error = $2,
+                       run_count = run_count + 1
+                   WHERE name = $1""",
+                job.name, str(e)[:1000]
+            )
+            return None
+        await db.execute(
+            """UPDATE scheduled_jobs
+               SET last_finished_at = now(), last_status = 'ok', last_error = NULL,
+                   last_result = $2, run_count = run_count + 1
+               WHERE name = $1""",
+            job.name, result
+        )
+        if result:
+            print(f"✓ Job {job.name}: {result}")
+        return result
+
+scheduler = Scheduler()
+scheduler.add_job("mark_overdue_installments", OVERDUE_JOB_INTERVAL_SECONDS, mark_overdue_installments)
+scheduler.add_job("purge_idempotency_keys", IDEMPOTENCY_PURGE_INTERVAL_SECONDS, purge_expired)
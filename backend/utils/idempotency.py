@@ -0,0 +1,142 @@
+"""
+Idempotency-Key support for POST endpoints that students retry.
+
+A client that may resend a request (double click, flaky mobile connection)
+sends the same Idempotency-Key header with every attempt. The first attempt
+claims the key and runs; its successful response is stored for
+IDEMPOTENCY_TTL_SECONDS and every later attempt gets that response back
+without running inserts or uploads again.
+
+    replay = await begin(db, scope, key, fingerprint(...))
+    if replay:
+        return replay
+    result = ...run the request...
+    await complete(db, scope, key, 201, result)
+
+When `db` is the request's own transaction (Depends(get_db_tx)), the claim
+commits or rolls back with the request's rows, and a concurrent duplicate
+waits on the key's row until the first attempt finishes, then replays it.
+
+Requests that must not hold a connection during slow I/O (uploads) claim and
+complete on short-lived connections instead, and call release() when they
+fail. A duplicate arriving while such an attempt runs gets a 409 until it
+finishes or its lock (IDEMPOTENCY_LOCK_SECONDS) runs out.
+
+Only successful responses are stored: a failed attempt gives its key back so
+the retry runs for real.
+"""
+import hashlib
+import os
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+from config.database import db_connection
+from utils.json_response import dumps
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "120"))
+IDEMPOTENCY_PURGE_BATCH = int(os.getenv("IDEMPOTENCY_PURGE_BATCH", "1000"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Claim the key, or take over one whose attempt died or whose response expired
+CLAIM_SQL = """
+    INSERT INTO idempotency_keys (scope, key, fingerprint, locked_until, expires_at)
+    VALUES ($1, $2, $3, now() + make_interval(secs => $4), now() + make_interval(secs => $5))
+    ON CONFLICT (scope, key) DO UPDATE
+    SET fingerprint = EXCLUDED.fingerprint,
+        status_code = NULL,
+        response_body = NULL,
+        locked_until = EXCLUDED.locked_until,
+        created_at = now(),
+        expires_at = EXCLUDED.expires_at
+    WHERE idempotency_keys.expires_at <= now()
+       OR (idempotency_keys.response_body IS NULL AND idempotency_keys.locked_until <= now())
+    RETURNING key
+"""
+
+def fingerprint(*parts) -> str:
+    """Hash of what makes two requests "the same"; a reused key with other content is rejected"""
+    return hashlib.sha256(dumps(parts)).hexdigest()
+
+async def begin(db, scope: str, key, request_fingerprint: str):
+    """Claim `key` for this request.
+
+    Returns None when the request should run (also when no key was sent), or
+    the stored response to send back as-is.
+    """
+    if key is None:
+        return None
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key inválido")
+
+    claimed = await db.fetchval(
+        CLAIM_SQL, scope, key, request_fingerprint, IDEMPOTENCY_LOCK_SECONDS, IDEMPOTENCY_TTL_SECONDS
+    )
+    if claimed:
+        return None
+
+    stored = await db.fetchrow(
+        "SELECT fingerprint, status_code, response_body FROM idempotency_keys WHERE scope = $1 AND key = $2",
+        scope, key
+    )
+    if stored is None:
+        # Purged between the two statements; nothing to replay
+        return await begin(db, scope, key, request_fingerprint)
+    if stored['fingerprint'] != request_fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key ya usado con otra solicitud"
+        )
+    if stored['response_body'] is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La solicitud anterior aún se está procesando, intenta nuevamente en unos segundos"
+        )
+    return Response(
+        content=stored['response_body'],
+        status_code=stored['status_code'],
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+async def complete(db, scope: str, key, status_code: int, result):
+    """Store the response of a claimed key"""
+    if key is None:
+        return
+    await db.execute(
+        """UPDATE idempotency_keys
+           SET status_code = $3, response_body = $4, locked_until = NULL
+           WHERE scope = $1 AND key = $2""",
+        scope, key, status_code, dumps(result).decode()
+    )
+
+async def release(scope: str, key):
+    """Forget a committed claim whose request failed, so the retry runs again.
+
+    Not for claims made inside the request transaction: its rollback undoes them.
+    """
+    if key is None:
+        return
+    async with db_connection() as db:
+        await db.execute(
+            "DELETE FROM idempotency_keys WHERE scope = $1 AND key = $2 AND response_body IS NULL",
+            scope, key
+        )
+
+async def purge_expired(db, batch_size: int = IDEMPOTENCY_PURGE_BATCH) -> int:
+    """Delete expired keys in index-ordered batches; returns how many were removed"""
+    removed = 0
+    while True:
+        status_line = await db.execute(
+            """DELETE FROM idempotency_keys
+               WHERE ctid = ANY(ARRAY(
+                   SELECT ctid FROM idempotency_keys
+                   WHERE expires_at <= now()
+                   ORDER BY expires_at
+                   LIMIT $1
+               ))""",
+            batch_size
+        )
+        deleted = int(status_line.split()[-1])
+        removed += deleted
+        if deleted < batch_size:
+            return removed
@@ -0,0 +1,146 @@
+"""
+Voucher image normalization, run in a process pool.
+
+Phone photos arrive as multi-megabyte JPEGs, often sideways with the
+rotation only in EXIF. Before storage each one is turned upright, scaled down
+to VOUCHER_MAX_DIMENSION and re-encoded as WEBP, plus a VOUCHER_THUMB_DIMENSION
+thumbnail for the admin list. Decoding and encoding hold the GIL for hundreds
+of milliseconds, so they run in worker processes, never in the event loop.
+
+Files Pillow cannot open (PDF vouchers) are stored as they are.
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
+from utils.metrics import Histogram
+
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))
+VOUCHER_MAX_DIMENSION = int(os.getenv("VOUCHER_MAX_DIMENSION", "1600"))
+VOUCHER_THUMB_DIMENSION = int(os.getenv("VOUCHER_THUMB_DIMENSION", "320"))
+VOUCHER_WEBP_QUALITY = int(os.getenv("VOUCHER_WEBP_QUALITY", "80"))
+VOUCHER_THUMB_QUALITY = int(os.getenv("VOUCHER_THUMB_QUALITY", "60"))
+# Pillow refuses images over twice this many pixels (decompression bombs)
+VOUCHER_MAX_PIXELS = int(os.getenv("VOUCHER_MAX_PIXELS", "40000000"))
+
+_executor = None
+_image_stats = {
+    "process_ms": Histogram(),
+    "processed": 0,
+    "passthrough": 0,
+    "pool_restarts": 0,
+    "bytes_in": 0,
+    "bytes_out": 0,
+    "thumb_bytes_out": 0,
+}
+
+def _encode(image, max_dimension: int, quality: int) -> bytes:
+    image = image.copy()
+    image.thumbnail((max_dimension, max_dimension))
+    output = io.BytesIO()
+    image.save(output, format="WEBP", quality=quality, method=4)
+    return output.getvalue()
+
+def normalize_voucher(content: bytes):
+    """(image, thumbnail) as WEBP bytes, or None when content is not an image.
+
+    Runs in a pool process; Pillow is imported there only.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    Image.MAX_IMAGE_PIXELS = VOUCHER_MAX_PIXELS
+    try:
+        image = Image.open(io.BytesIO(content))
+    except UnidentifiedImageError:
+        return None
+
+    with image:
+        # JPEG decodes straight to a reduced scale when it is much larger than needed
+        image.draft("RGB", (VOUCHER_MAX_DIMENSION, VOUCHER_MAX_DIMENSION))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        return (
+            _encode(image, VOUCHER_MAX_DIMENSION, VOUCHER_WEBP_QUALITY),
+            _encode(image, VOUCHER_THUMB_DIMENSION, VOUCHER_THUMB_QUALITY),
+        )
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs an event loop and DB pool is unsafe
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    """Drop a pool whose worker died; the next call builds a fresh one"""
+    global _executor
+    # Concurrent callers see the same broken pool: only the first replaces it
+    if _executor is executor:
+        _executor = None
+        _image_stats["pool_restarts"] += 1
+        print("⚠️  Image worker died, restarting the image process pool")
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_image_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def _run_in_pool(content: bytes):
+    """normalize_voucher on the pool, retried once on a fresh pool if a worker dies"""
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        executor = _get_executor()
+        try:
+            return await loop.run_in_executor(executor, normalize_voucher, content)
+        except BrokenProcessPool:
+            # A worker was killed (OOM, crash): the pool is unusable from now on
+            _discard_executor(executor)
+            if attempt == 1:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="No se pudo procesar la imagen, intenta nuevamente"
+                )
+
+async def process_voucher(content: bytes):
+    """normalize_voucher on the process pool; 400 for images Pillow refuses as too large"""
+    from PIL import Image
+
+    start = time.perf_counter()
+    try:
+        result = await _run_in_pool(content)
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError):
+        # Pillow's errors for bombs, truncated and corrupt files
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La imagen está dañada o es demasiado grande"
+        )
+    _image_stats["process_ms"].observe((time.perf_counter() - start) * 1000)
+    _image_stats["bytes_in"] += len(content)
+    if result is None:
+        _image_stats["passthrough"] += 1
+        return None
+    _image_stats["processed"] += 1
+    _image_stats["bytes_out"] += len(result[0])
+    _image_stats["thumb_bytes_out"] += len(result[1])
+    return result
+
+def get_image_stats():
+    return {
+        "workers": IMAGE_PROCESS_WORKERS,
+        "processed": _image_stats["processed"],
+        "passthrough": _image_stats["passthrough"],
+        "pool_restarts": _image_stats["pool_restarts"],
+        "bytes_in": _image_stats["bytes_in"],
+        "bytes_out": _image_stats["bytes_out"],
+        "thumb_bytes_out": _image_stats["thumb_bytes_out"],
+        "process_ms": _image_stats["process_ms"].snapshot(),
+    }
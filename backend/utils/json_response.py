@@ -0,0 +1,97 @@
+"""
+Fast JSON path for routes that return many asyncpg records.
+
+Whatever a route returns goes through FastAPI's jsonable_encoder, which walks
+every value of every row in Python before json.dumps runs. Returning
+RecordJSONResponse(rows) skips that: records go straight to bytes through
+orjson. Output matches what jsonable_encoder produced (Decimal as int/float,
+date/time/datetime in ISO format), so routes can adopt it one at a time.
+
+For lists that grow with history, RecordStreamResponse streams the rows of a
+query as a JSON array from a server-side cursor, so memory stays bounded by
+STREAM_FETCH_ROWS no matter how large the table gets.
+"""
+import datetime
+import decimal
+import os
+from contextlib import AsyncExitStack
+
+import anyio
+import orjson
+from asyncpg import Record
+from fastapi.responses import JSONResponse, StreamingResponse
+from config.database import db_connection
+
+# Rows fetched from the cursor (and serialized) per chunk
+STREAM_FETCH_ROWS = int(os.getenv("STREAM_FETCH_ROWS", "500"))
+
+def _default(value):
+    if isinstance(value, Record):
+        return dict(value)
+    if isinstance(value, decimal.Decimal):
+        # Same rule as pydantic's decimal_encoder
+        exponent = value.as_tuple().exponent
+        if isinstance(exponent, int) and exponent >= 0:
+            return int(value)
+        return float(value)
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class RecordJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; accepts asyncpg records anywhere in content"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+async def _json_array(cursor, fetch_rows: int):
+    yield b"["
+    first = True
+    while True:
+        rows = await cursor.fetch(fetch_rows)
+        if not rows:
+            break
+        # dumps() of the batch minus its brackets; batches are joined with ","
+        chunk = dumps(rows)[1:-1]
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
+
+class RecordStreamResponse(StreamingResponse):
+    """Chunked JSON array of a query's rows, read through a server-side cursor.
+
+    Build it with `await RecordStreamResponse.open(sql, *args)`. The connection,
+    transaction and cursor are opened before the response is returned, so pool
+    timeouts and SQL errors still become normal error responses; they are
+    released once the body is sent or the client disconnects. The connection is
+    acquired here rather than through Depends(get_db) because dependencies are
+    torn down before a streaming body is sent.
+    """
+
+    @classmethod
+    async def open(cls, sql: str, *args, fetch_rows: int = STREAM_FETCH_ROWS):
+        stack = AsyncExitStack()
+        try:
+            db = await stack.enter_async_context(db_connection())
+            # Cursors only live inside a transaction
+            await stack.enter_async_context(db.transaction())
+            cursor = await db.cursor(sql, *args)
+        except BaseException:
+            await stack.aclose()
+            raise
+        response = cls(_json_array(cursor, fetch_rows), media_type="application/json")
+        response._resources = stack
+        return response
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+                await self._resources.aclose()
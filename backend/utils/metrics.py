@@ -0,0 +1,47 @@
+"""
+Minimal in-process metrics (per worker), reported through /api/admin/metrics
+"""
+import bisect
+
+# Milliseconds; roughly doubling so both fast paths and stalls are visible
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the given percentile"""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return float(bound)
+        return self.max
+
+    def snapshot(self):
+        buckets = {f"le_{bound}": count for bound, count in zip(self.buckets, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": round(self.max, 3),
+            "buckets": buckets,
+        }
@@ -0,0 +1,136 @@
+"""
+Per-statement timing for connections handed out by config.database.
+
+Every query is timed. Statements slower than DB_SLOW_QUERY_MS are printed with
+their normalized SQL, each request gets a query count (per route aggregates in
+/api/admin/metrics), and a warning is printed when one request runs the same
+statement shape more than DB_REPEATED_QUERY_THRESHOLD times (likely an N+1 loop).
+"""
+import contextvars
+import os
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_REPEATED_QUERY_THRESHOLD = int(os.getenv("DB_REPEATED_QUERY_THRESHOLD", "10"))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_COMMENT = re.compile(r"--[^\n]*")
+
+_current = contextvars.ContextVar("db_request_stats", default=None)
+
+route_stats = {}
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    """Statement shape: literals replaced, comments and whitespace collapsed"""
+    sql = _COMMENT.sub(" ", sql)
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+class RequestQueryStats:
+    def __init__(self, route: str):
+        self.route = route
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes = Counter()
+        self.warned = set()
+
+    def record(self, shape: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.shapes[shape] += 1
+        if self.shapes[shape] > DB_REPEATED_QUERY_THRESHOLD and shape not in self.warned:
+            self.warned.add(shape)
+            print(
+                f"⚠️  Possible N+1 in {self.route}: statement ran more than "
+                f"{DB_REPEATED_QUERY_THRESHOLD} times in one request: {shape[:300]}"
+            )
+
+def start_request(route: str) -> RequestQueryStats:
+    stats = RequestQueryStats(route)
+    _current.set(stats)
+    return stats
+
+def current_request_stats():
+    return _current.get()
+
+def finish_request(stats: RequestQueryStats, route: str):
+    """Fold a finished request into the per-route aggregates"""
+    entry = route_stats.setdefault(route, {
+        "requests": 0,
+        "queries": 0,
+        "max_queries": 0,
+        "db_ms": 0.0,
+        "n_plus_one_warnings": 0,
+    })
+    entry["requests"] += 1
+    entry["queries"] += stats.count
+    entry["max_queries"] = max(entry["max_queries"], stats.count)
+    entry["db_ms"] += stats.total_ms
+    entry["n_plus_one_warnings"] += len(stats.warned)
+
+def get_route_stats():
+    return {
+        route: {
+            **entry,
+            "avg_queries": round(entry["queries"] / entry["requests"], 2),
+            "avg_db_ms": round(entry["db_ms"] / entry["requests"], 3),
+            "db_ms": round(entry["db_ms"], 3),
+        }
+        for route, entry in sorted(route_stats.items())
+    }
+
+def _record(sql: str, elapsed_ms: float):
+    shape = normalize_sql(sql)
+    stats = _current.get()
+    if stats is not None:
+        stats.record(shape, elapsed_ms)
+    if elapsed_ms >= DB_SLOW_QUERY_MS:
+        route = stats.route if stats else "-"
+        print(f"🐢 Slow query ({elapsed_ms:.1f} ms) in {route}: {shape[:500]}")
+
+class InstrumentedConnection:
+    """Wraps an asyncpg connection; anything not timed here is delegated as-is"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    @property
+    def raw_connection(self):
+        return self._connection
+
+    async def _timed(self, method, sql, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await method(sql, *args, **kwargs)
+        finally:
+            _record(sql, (time.perf_counter() - start) * 1000)
+
+    async def fetch(self, sql, *args, **kwargs):
+        return await self._timed(self._connection.fetch, sql, *args, **kwargs)
+
+    async def fetchrow(self, sql, *args, **kwargs):
+        return await self._timed(self._connection.fetchrow, sql, *args, **kwargs)
+
+    async def fetchval(self, sql, *args, **kwargs):
+        return await self._timed(self._connection.fetchval, sql, *args, **kwargs)
+
+    async def execute(self, sql, *args, **kwargs):
+        return await self._timed(self._connection.execute, sql, *args, **kwargs)
+
+    async def executemany(self, sql, *args, **kwargs):
+        return await self._timed(self._connection.executemany, sql, *args, **kwargs)
+
+    def cursor(self, sql, *args, **kwargs):
+        # Cursors fetch lazily; count the statement once when it is opened
+        _record(sql, 0.0)
+        return self._connection.cursor(sql, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
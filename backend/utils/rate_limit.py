@@ -0,0 +1,177 @@
+"""
+Login throttling: sliding-window failure limits per DNI and per client IP,
+with exponential lockouts checked *before* bcrypt runs.
+
+The default store is in-process memory. With several uvicorn workers set
+LOGIN_THROTTLE_BACKEND=postgres so every worker sees the same counters.
+"""
+import os
+import time
+from collections import deque
+from config.database import db_connection
+
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")
+LOGIN_THROTTLE_WINDOW_SECONDS = int(os.getenv("LOGIN_THROTTLE_WINDOW_SECONDS", "300"))
+LOGIN_THROTTLE_MAX_FAILURES_DNI = int(os.getenv("LOGIN_THROTTLE_MAX_FAILURES_DNI", "5"))
+LOGIN_THROTTLE_MAX_FAILURES_IP = int(os.getenv("LOGIN_THROTTLE_MAX_FAILURES_IP", "30"))
+LOGIN_THROTTLE_BASE_LOCKOUT_SECONDS = int(os.getenv("LOGIN_THROTTLE_BASE_LOCKOUT_SECONDS", "30"))
+LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS = int(os.getenv("LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS", "3600"))
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "50000"))
+
+# Number of reverse proxies in front of the API (Railway's edge counts as one)
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+
+def get_client_ip(request) -> str:
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and TRUSTED_PROXY_HOPS > 0:
+        hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+        if hops:
+            # Entries left of the ones our proxies appended are client-controlled
+            return hops[-min(TRUSTED_PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+def lockout_seconds(lockout_count: int) -> int:
+    """Lockout length doubles with every lockout: 30s, 60s, 120s..."""
+    return min(
+        LOGIN_THROTTLE_BASE_LOCKOUT_SECONDS * (2 ** lockout_count),
+        LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS
+    )
+
+class MemoryThrottleStore:
+    def __init__(self):
+        self._failures = {}
+        self._lockouts = {}
+
+    async def locked_for(self, keys) -> int:
+        now = time.time()
+        remaining = 0
+        for key in keys:
+            lock = self._lockouts.get(key)
+            if lock and lock[0] > now:
+                remaining = max(remaining, int(lock[0] - now) + 1)
+        return remaining
+
+    async def record_failure(self, key: str, limit: int) -> bool:
+        now = time.time()
+        failures = self._failures.setdefault(key, deque())
+        failures.append(now)
+        while failures and failures[0] <= now - LOGIN_THROTTLE_WINDOW_SECONDS:
+            failures.popleft()
+
+        locked = False
+        if len(failures) >= limit:
+            locked_until, count = self._lockouts.get(key, (0, 0))
+            # Escalation resets once the account has been quiet for a full max lockout
+            if locked_until < now - LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS:
+                count = 0
+            self._lockouts[key] = (now + lockout_seconds(count), count + 1)
+            failures.clear()
+            locked = True
+
+        if len(self._failures) > LOGIN_THROTTLE_MAX_KEYS:
+            self._prune(now)
+        return locked
+
+    async def reset(self, key: str):
+        self._failures.pop(key, None)
+        self._lockouts.pop(key, None)
+
+    def _prune(self, now: float):
+        cutoff = now - LOGIN_THROTTLE_WINDOW_SECONDS
+        for key in [k for k, f in self._failures.items() if not f or f[-1] <= cutoff]:
+            del self._failures[key]
+        for key in [k for k, l in self._lockouts.items() if l[0] < now - LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS]:
+            del self._lockouts[key]
+
+class PostgresThrottleStore:
+    """Shared counters for multi-worker deployments"""
+
+    async def locked_for(self, keys) -> int:
+        async with db_connection() as conn:
+            remaining = await conn.fetchval(
+                """SELECT CEIL(EXTRACT(EPOCH FROM MAX(locked_until) - now()))::int
+                   FROM login_throttle_lockouts
+                   WHERE key = ANY($1::text[]) AND locked_until > now()""",
+                list(keys)
+            )
+        return remaining or 0
+
+    async def record_failure(self, key: str, limit: int) -> bool:
+        async with db_connection() as conn:
+            async with conn.transaction():
+                failures = await conn.fetchval(
+                    """WITH inserted AS (
+                           INSERT INTO login_throttle_failures (key) VALUES ($1)
+                       )
+                       SELECT COUNT(*) + 1 FROM login_throttle_failures
+                       WHERE key = $1 AND failed_at > now() - make_interval(secs => $2)""",
+                    key, LOGIN_THROTTLE_WINDOW_SECONDS
+                )
+                if failures < limit:
+                    return False
+
+                previous = await conn.fetchrow(
+                    """SELECT lockout_count,
+                              locked_until < now() - make_interval(secs => $2) AS expired
+                       FROM login_throttle_lockouts WHERE key = $1 FOR UPDATE""",
+                    key, LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS
+                )
+                # Escalation resets once the key has been quiet for a full max lockout
+                count = previous['lockout_count'] if previous and not previous['expired'] else 0
+
+                await conn.execute(
+                    """INSERT INTO login_throttle_lockouts (key, locked_until, lockout_count)
+                       VALUES ($1, now() + make_interval(secs => $2), $3)
+                       ON CONFLICT (key) DO UPDATE
+                       SET locked_until = EXCLUDED.locked_until, lockout_count = EXCLUDED.lockout_count""",
+                    key, lockout_seconds(count), count + 1
+                )
+                await conn.execute(
+                    "DELETE FROM login_throttle_failures WHERE key = $1 OR failed_at < now() - make_interval(secs => $2)",
+                    key, LOGIN_THROTTLE_WINDOW_SECONDS
+                )
+                return True
+
+    async def reset(self, key: str):
+        async with db_connection() as conn:
+            await conn.execute("DELETE FROM login_throttle_failures WHERE key = $1", key)
+            await conn.execute("DELETE FROM login_throttle_lockouts WHERE key = $1", key)
+
+class LoginThrottle:
+    def __init__(self, backend: str = LOGIN_THROTTLE_BACKEND):
+        self.backend = backend
+        self.store = PostgresThrottleStore() if backend == "postgres" else MemoryThrottleStore()
+        self.throttled = 0
+        self.lockouts = {"dni": 0, "ip": 0}
+
+    @staticmethod
+    def _keys(dni: str, ip: str):
+        return f"dni:{dni}", f"ip:{ip}"
+
+    async def retry_after(self, dni: str, ip: str) -> int:
+        """Seconds the caller must wait, 0 when the attempt may proceed"""
+        remaining = await self.store.locked_for(self._keys(dni, ip))
+        if remaining:
+            self.throttled += 1
+        return remaining
+
+    async def record_failure(self, dni: str, ip: str):
+        dni_key, ip_key = self._keys(dni, ip)
+        if await self.store.record_failure(dni_key, LOGIN_THROTTLE_MAX_FAILURES_DNI):
+            self.lockouts["dni"] += 1
+        if await self.store.record_failure(ip_key, LOGIN_THROTTLE_MAX_FAILURES_IP):
+            self.lockouts["ip"] += 1
+
+    async def record_success(self, dni: str, ip: str):
+        dni_key, _ = self._keys(dni, ip)
+        await self.store.reset(dni_key)
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "window_seconds": LOGIN_THROTTLE_WINDOW_SECONDS,
+            "throttled_attempts": self.throttled,
+            "lockouts": dict(self.lockouts),
+        }
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,35 @@
+"""
+Typeahead search over people tables (students, teachers) by DNI or name.
+
+A digits-only query matches DNI prefixes; anything else matches the full name
+by substring or trigram similarity, so typos and partial names still rank.
+Both paths are served by the indexes from migration 005.
+"""
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_RESULTS = 50
+
+FULL_NAME = "(first_name || ' ' || last_name)"
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+async def search_people(db, table: str, columns: str, q: str, limit: int):
+    """Top `limit` rows of table matching q, best match first"""
+    q = " ".join(q.split())
+    if q.isdigit():
+        return await db.fetch(
+            f"""SELECT {columns}, 1.0::real AS score
+                FROM {table}
+                WHERE dni LIKE $1
+                ORDER BY dni
+                LIMIT $2""",
+            escape_like(q) + "%", limit
+        )
+    return await db.fetch(
+        f"""SELECT {columns}, similarity({FULL_NAME}, $1) AS score
+            FROM {table}
+            WHERE {FULL_NAME} ILIKE $2 OR {FULL_NAME} % $1
+            ORDER BY ({FULL_NAME} ILIKE $3) DESC, score DESC, last_name, first_name
+            LIMIT $4""",
+        q, f"%{escape_like(q)}%", f"{escape_like(q)}%", limit
+    )
@@ -0,0 +1,60 @@
+"""
+Seat capacity for course and package offerings.
+
+Counters (seats_taken) are maintained and enforced by the enrollments trigger
+from migration 006; a full offering surfaces as asyncpg.CheckViolationError on
+the statement that tried to take the seat. Controllers run that statement in a
+savepoint and turn the violation into the usual {"error": ...} result.
+"""
+import asyncpg
+
+SEAT_CONSTRAINTS = {
+    "course_offering_seats": "course",
+    "package_offering_seats": "package",
+}
+
+def is_seat_violation(exc: Exception) -> bool:
+    return isinstance(exc, asyncpg.CheckViolationError) and exc.constraint_name in SEAT_CONSTRAINTS
+
+async def seat_error_message(db, exc: asyncpg.CheckViolationError) -> str:
+    """Spanish message naming the full offering"""
+    offering_id = int(exc.detail)
+    if SEAT_CONSTRAINTS[exc.constraint_name] == "course":
+        row = await db.fetchrow(
+            """SELECT c.name, co.group_label FROM course_offerings co
+               JOIN courses c ON co.course_id = c.id WHERE co.id = $1""",
+            offering_id
+        )
+    else:
+        row = await db.fetchrow(
+            """SELECT p.name, po.group_label FROM package_offerings po
+               JOIN packages p ON po.package_id = p.id WHERE po.id = $1""",
+            offering_id
+        )
+    display = row['name'] if row else f"#{offering_id}"
+    if row and row['group_label']:
+        display += f" (Grupo {row['group_label']})"
+    return f"No hay vacantes disponibles en: {display}. Por favor, elija otro grupo."
+
+async def get_availability(cycle_id: int, db):
+    """Capacity and seats left per offering, straight from the counters"""
+    rows = await db.fetch(
+        """SELECT 'course' AS type, co.id, co.capacity, co.seats_taken
+           FROM course_offerings co
+           WHERE $1::int IS NULL OR co.cycle_id = $1
+           UNION ALL
+           SELECT 'package', po.id, po.capacity, po.seats_taken
+           FROM package_offerings po
+           WHERE $1::int IS NULL OR po.cycle_id = $1""",
+        cycle_id
+    )
+    return [
+        {
+            "type": row['type'],
+            "id": row['id'],
+            "capacity": row['capacity'],
+            "seats_taken": row['seats_taken'],
+            "seats_available": None if row['capacity'] is None else max(row['capacity'] - row['seats_taken'], 0),
+        }
+        for row in rows
+    ]
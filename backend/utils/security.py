@@ -1,20 +1,102 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+import asyncio
 import os
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hash policy. Hashes whose cost falls outside [BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS]
+# are reported by needs_update() and rehashed at BCRYPT_ROUNDS on the next login.
+# Use scripts/bench_bcrypt_cost.py to pick a cost for the hardware.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", str(BCRYPT_ROUNDS)))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", str(BCRYPT_ROUNDS)))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_MIN_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_MAX_ROUNDS
+)
 
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 24 * 60  # 24 hours
 
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop.
+# PASSWORD_HASH_MAX_CONCURRENCY caps hashes in flight; callers beyond
+# PASSWORD_HASH_MAX_QUEUE waiting are rejected with 503 instead of piling up.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_CONCURRENCY = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", str(PASSWORD_HASH_WORKERS)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash")
+_hash_semaphore = asyncio.Semaphore(PASSWORD_HASH_MAX_CONCURRENCY)
+_hash_stats = {
+    "in_flight": 0,
+    "queued": 0,
+    "max_queued": 0,
+    "completed": 0,
+    "rejected": 0,
+}
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Returns (valid, new_hash); new_hash is set when the stored hash is off-policy"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def _run_hash_job(func, *args):
+    if _hash_stats["queued"] >= PASSWORD_HASH_MAX_QUEUE:
+        _hash_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, intenta nuevamente en unos segundos"
+        )
+
+    _hash_stats["queued"] += 1
+    _hash_stats["max_queued"] = max(_hash_stats["max_queued"], _hash_stats["queued"])
+    try:
+        await _hash_semaphore.acquire()
+    finally:
+        _hash_stats["queued"] -= 1
+
+    _hash_stats["in_flight"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_stats["in_flight"] -= 1
+        _hash_stats["completed"] += 1
+        _hash_semaphore.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the hashing pool, for use inside request handlers"""
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    """verify_and_update_password on the hashing pool"""
+    return await _run_hash_job(verify_and_update_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the hashing pool, for use inside request handlers"""
+    return await _run_hash_job(get_password_hash, password)
+
+def get_hash_pool_stats():
+    return {
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_concurrency": PASSWORD_HASH_MAX_CONCURRENCY,
+        "max_queue": PASSWORD_HASH_MAX_QUEUE,
+        **_hash_stats,
+    }
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -25,6 +107,16 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_principal_token(user_id: int, role: str, username: str, related_id: int = None, version: int = 0):
+    """Token carrying every claim get_current_user needs, so it can skip the DB"""
+    return create_access_token({
+        "id": user_id,
+        "role": role,
+        "username": username,
+        "related_id": related_id,
+        "ver": version
+    })
+
 def decode_token(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -0,0 +1,113 @@
+"""
+Per-principal token versions used to revoke self-contained JWTs.
+
+Every token carries the version its principal had when it was issued ("ver").
+Bumping the version (password reset, account deletion) makes older tokens
+invalid. The middleware checks against an in-memory copy of the table that is
+refreshed incrementally from Postgres every TOKEN_VERSION_REFRESH_SECONDS.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from config.database import db_connection
+
+TOKEN_VERSION_REFRESH_SECONDS = float(os.getenv("TOKEN_VERSION_REFRESH_SECONDS", "5"))
+
+# Rows committed slightly after a later updated_at must still be picked up
+_REFRESH_OVERLAP = timedelta(seconds=30)
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def principal_kind(role: str) -> str:
+    """Students live in their own table, everyone else in users"""
+    return "student" if role == "student" else "user"
+
+class TokenVersionMap:
+    def __init__(self, refresh_interval: float = TOKEN_VERSION_REFRESH_SECONDS):
+        self.refresh_interval = refresh_interval
+        self._versions = {}
+        self._watermark = _EPOCH
+        self._last_refresh = 0.0
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.rejected = 0
+
+    def get(self, kind: str, principal_id: int) -> int:
+        return self._versions.get((kind, principal_id), 0)
+
+    def _apply(self, kind: str, principal_id: int, version: int):
+        key = (kind, principal_id)
+        if version > self._versions.get(key, 0):
+            self._versions[key] = version
+
+    def is_current(self, kind: str, principal_id: int, version: int) -> bool:
+        if version < self.get(kind, principal_id):
+            self.rejected += 1
+            return False
+        return True
+
+    async def ensure_fresh(self):
+        if time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+
+        async with self._lock:
+            if time.monotonic() - self._last_refresh < self.refresh_interval:
+                return
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep serving from the last known map; retry on the next interval
+                self.refresh_errors += 1
+                print(f"Token version refresh failed: {e}")
+            self._last_refresh = time.monotonic()
+
+    async def refresh(self):
+        async with db_connection() as conn:
+            rows = await conn.fetch(
+                """SELECT kind, principal_id, version, updated_at
+                   FROM auth_token_versions
+                   WHERE updated_at > $1""",
+                self._watermark - _REFRESH_OVERLAP
+            )
+
+        for row in rows:
+            self._apply(row['kind'], row['principal_id'], row['version'])
+            if row['updated_at'] > self._watermark:
+                self._watermark = row['updated_at']
+        self.refreshes += 1
+
+    async def fetch(self, db, kind: str, principal_id: int) -> int:
+        """Authoritative version for issuing a new token (the map may lag)"""
+        version = await db.fetchval(
+            "SELECT version FROM auth_token_versions WHERE kind = $1 AND principal_id = $2",
+            kind, principal_id
+        )
+        if version is None:
+            return 0
+        self._apply(kind, principal_id, version)
+        return version
+
+    async def bump(self, db, kind: str, principal_id: int) -> int:
+        """Invalidate every token issued so far for this principal"""
+        version = await db.fetchval(
+            """INSERT INTO auth_token_versions (kind, principal_id, version, updated_at)
+               VALUES ($1, $2, 1, now())
+               ON CONFLICT (kind, principal_id)
+               DO UPDATE SET version = auth_token_versions.version + 1, updated_at = now()
+               RETURNING version""",
+            kind, principal_id
+        )
+        self._apply(kind, principal_id, version)
+        return version
+
+    def stats(self):
+        return {
+            "size": len(self._versions),
+            "refresh_interval_seconds": self.refresh_interval,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "rejected_tokens": self.rejected,
+        }
+
+token_versions = TokenVersionMap()
@@ -0,0 +1,37 @@
+"""
+Bounded reads of uploaded files.
+
+Starlette spools multipart files to a temporary file before the handler runs;
+read_upload() pulls one back in UPLOAD_CHUNK_BYTES chunks, hashing as it goes,
+and stops with 413 as soon as the file passes the limit. Requests whose
+Content-Length is already over it are turned away by reject_oversized_upload
+in main.py before the body is read at all.
+"""
+import hashlib
+import os
+from fastapi import HTTPException, UploadFile, status
+
+VOUCHER_MAX_BYTES = int(os.getenv("VOUCHER_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+# Multipart boundaries and the other form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+def too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"El archivo supera el máximo de {round(max_bytes / (1024 * 1024), 1):g} MB"
+    )
+
+async def read_upload(file: UploadFile, max_bytes: int = VOUCHER_MAX_BYTES):
+    """Returns (content, sha256 hex digest); raises 413 past max_bytes"""
+    if file.size is not None and file.size > max_bytes:
+        raise too_large(max_bytes)
+
+    digest = hashlib.sha256()
+    content = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        if len(content) + len(chunk) > max_bytes:
+            raise too_large(max_bytes)
+        digest.update(chunk)
+        content += chunk
+    return bytes(content), digest.hexdigest()
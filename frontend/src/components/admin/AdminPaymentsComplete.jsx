@@ -247,7 +247,27 @@ const AdminPaymentsComplete = () => {
                   />
                 </TableCell>
                 <TableCell className="admin-table-cell">
-                  {payment.voucher_url ? (
+                  {payment.voucher_thumb_url ? (
+                    <a
+                      href={payment.voucher_url}
+                      target="_blank"
+                      rel="noopener noreferrer"
+                      title="Ver voucher"
+                    >
+                      <img
+                        src={payment.voucher_thumb_url}
+                        alt="Voucher"
+                        loading="lazy"
+                        style={{
+                          width: "64px",
+                          height: "64px",
+                          objectFit: "cover",
+                          borderRadius: "4px",
+                          border: "1px solid #ccc",
+                        }}
+                      />
+                    </a>
+                  ) : payment.voucher_url ? (
                     <Button
                       size="small"
                       href={payment.voucher_url}
@@ -1,6 +1,7 @@
 // src/components/student/StudentAvailableCourses.jsx
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
+import { useIdempotencyKey } from '../../hooks/useIdempotencyKey';
 import {
   Box,
   Typography,
@@ -68,6 +69,7 @@ const StudentAvailableCourses = () => {
   const [success, setSuccess] = useState('');
   const [schedulesPreview, setSchedulesPreview] = useState({});
   const [loadingSchedules, setLoadingSchedules] = useState(false);
+  const enrollKey = useIdempotencyKey();
 
   useEffect(() => {
     loadData();
@@ -191,7 +193,8 @@ const StudentAvailableCourses = () => {
     try {
       setError('');
       const items = selectedItems.map(item => ({ type: item.type, id: item.id }));
-      await enrollmentsAPI.create(items);
+      await enrollmentsAPI.create(items, enrollKey.getKey(JSON.stringify(items)));
+      enrollKey.resetKey();
       setSuccess('matricula_exitosa'); // Marcador especial para mostrar info de pago
       setSelectedItems([]);
       setOpenDialog(false);
@@ -21,6 +21,7 @@ import {
   enrollmentsAPI,
   paymentsAPI,
 } from "../../services/api";
+import { useIdempotencyKey } from "../../hooks/useIdempotencyKey";
 
 const StudentDashboard = () => {
   const [courses, setCourses] = useState([]);
@@ -31,6 +32,8 @@ const StudentDashboard = () => {
   const [voucherFile, setVoucherFile] = useState(null);
   const [error, setError] = useState("");
   const [activeCycle, setActiveCycle] = useState(null);
+  const enrollKey = useIdempotencyKey();
+  const uploadKey = useIdempotencyKey();
 
   useEffect(() => {
     coursesAPI
@@ -59,7 +62,11 @@ const StudentDashboard = () => {
   const handleCreate = async () => {
     try {
       const items = selected.map((i) => ({ type: i.type, id: i.id }));
-      const data = await enrollmentsAPI.create(items);
+      const data = await enrollmentsAPI.create(
+        items,
+        enrollKey.getKey(JSON.stringify(items))
+      );
+      enrollKey.resetKey();
       const created = data.created || [];
       setPayments(created);
       setOpenPay(true);
@@ -72,7 +79,12 @@ const StudentDashboard = () => {
   const handleUpload = async (enrollmentId) => {
     try {
       if (!voucherFile) return setError("Seleccione un voucher");
-      await paymentsAPI.uploadVoucher(enrollmentId, voucherFile);
+      await paymentsAPI.uploadVoucher(
+        enrollmentId,
+        voucherFile,
+        uploadKey.getKey(`${enrollmentId}:${voucherFile.name}:${voucherFile.size}:${voucherFile.lastModified}`)
+      );
+      uploadKey.resetKey();
       alert("Voucher subido correctamente");
       setOpenPay(false);
       setSelected([]);
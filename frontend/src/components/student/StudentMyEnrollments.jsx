@@ -33,6 +33,7 @@ import { enrollmentsAPI, paymentsAPI } from "../../services/api";
 import { useAuth } from "../../contexts/AuthContext";
 import "./student-dashboard.css";
 import { useDialog } from "../../hooks/useDialog";
+import { useIdempotencyKey } from "../../hooks/useIdempotencyKey";
 import DialogWrapper from "../common/DialogWrapper";
 
 const StudentMyEnrollments = () => {
@@ -44,6 +45,7 @@ const StudentMyEnrollments = () => {
   const [voucherFile, setVoucherFile] = useState(null);
   const [error, setError] = useState("");
   const [success, setSuccess] = useState("");
+  const uploadKey = useIdempotencyKey();
 
   const {
     confirmDialog,
@@ -81,7 +83,12 @@ const StudentMyEnrollments = () => {
 
     try {
       setError("");
-      await paymentsAPI.uploadVoucher(installmentId, voucherFile);
+      await paymentsAPI.uploadVoucher(
+        installmentId,
+        voucherFile,
+        uploadKey.getKey(`${installmentId}:${voucherFile.name}:${voucherFile.size}:${voucherFile.lastModified}`)
+      );
+      uploadKey.resetKey();
       setSuccess("voucher_subido"); // Marcador especial para mostrar mensaje completo
       setOpenVoucherDialog(false);
       setVoucherFile(null);
@@ -0,0 +1,23 @@
+// src/hooks/useIdempotencyKey.js
+import { useRef } from 'react';
+import { newIdempotencyKey } from '../services/api';
+
+// Una clave por acción del usuario: se mantiene entre reintentos y doble clic
+// (el backend responde lo mismo sin repetir la operación). getKey(datos) la
+// renueva si cambian los datos enviados; resetKey() tras un envío exitoso.
+export const useIdempotencyKey = () => {
+    const current = useRef({ payload: null, key: null });
+
+    const getKey = (payload) => {
+        if (!current.current.key || current.current.payload !== payload) {
+            current.current = { payload, key: newIdempotencyKey() };
+        }
+        return current.current.key;
+    };
+
+    const resetKey = () => {
+        current.current = { payload: null, key: null };
+    };
+
+    return { getKey, resetKey };
+};
@@ -4,6 +4,23 @@
 const API_BASE_URL =
   import.meta.env.VITE_API_URL || "http://localhost:4000/api";
 
+// Clave de una acción del usuario (ver hooks/useIdempotencyKey); los reintentos
+// y los doble clic de esa acción la reutilizan
+export const newIdempotencyKey = () =>
+  crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`;
+
+// Solo las peticiones con Idempotency-Key se reintentan ante fallos de red:
+// el backend devuelve la respuesta guardada en vez de repetir la operación
+async function fetchWithRetry(url, config, retries = 2) {
+  try {
+    return await fetch(url, config);
+  } catch (error) {
+    if (retries === 0 || !config.headers["Idempotency-Key"]) throw error;
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+    return fetchWithRetry(url, config, retries - 1);
+  }
+}
+
 // Función helper para hacer peticiones
 async function request(endpoint, options = {}) {
   const token = localStorage.getItem("token");
@@ -23,7 +40,7 @@ async function request(endpoint, options = {}) {
   }
 
   try {
-    const response = await fetch(`${API_BASE_URL}${endpoint}`, config);
+    const response = await fetchWithRetry(`${API_BASE_URL}${endpoint}`, config);
     const data = await response.json();
 
     // Check if backend returned an error field
@@ -67,6 +84,8 @@ export const studentsAPI = {
       body: JSON.stringify(data),
     }),
   getAll: () => request("/students"),
+  search: (q, limit = 10) =>
+    request(`/students/search?q=${encodeURIComponent(q)}&limit=${limit}`),
 };
 
 // API de ciclos
@@ -187,6 +206,8 @@ export const packagesAPI = {
 // API de docentes
 export const teachersAPI = {
   getAll: () => request("/teachers"),
+  search: (q, limit = 10) =>
+    request(`/teachers/search?q=${encodeURIComponent(q)}&limit=${limit}`),
   getOne: (id) => request(`/teachers/${id}`),
   create: (data) =>
     request("/teachers", {
@@ -227,9 +248,10 @@ export const enrollmentsAPI = {
     return request(url);
   },
   getAllAdmin: () => request("/enrollments/admin"),
-  create: (items) =>
+  create: (items, idempotencyKey) =>
     request("/enrollments", {
       method: "POST",
+      headers: { ...(idempotencyKey && { "Idempotency-Key": idempotencyKey }) },
       body: JSON.stringify({ items }),
     }),
   updateStatus: (enrollmentId, status) =>
@@ -254,12 +276,13 @@ export const paymentsAPI = {
     const url = status ? `/payments?status=${status}` : "/payments";
     return request(url);
   },
-  uploadVoucher: (installmentId, file) => {
+  uploadVoucher: (installmentId, file, idempotencyKey) => {
     const formData = new FormData();
     formData.append("voucher", file);
     formData.append("installment_id", installmentId);
     return request("/payments/upload", {
       method: "POST",
+      headers: { ...(idempotencyKey && { "Idempotency-Key": idempotencyKey }) },
       body: formData,
     });
   },